@@ -0,0 +1,146 @@
+"""취급지표 / 상품별 취급액 표 읽기 전용 HTTP API (대시보드와 같은 engine 계산)
+
+    python api_server.py [--host 127.0.0.1] [--port 8502]
+
+    GET /months                                    -> {"data_version": ..., "months": [...]}
+    GET /tables/kpi?month=YYYYMM[&format=json]     -> 취급지표 숫자 값
+    GET /tables/product?month=YYYYMM&format=arrow  -> 상품별 취급액 숫자 값 (Arrow IPC stream)
+
+화면 스크래핑이나 Excel 다운로드 대신 다른 도구가 같은 숫자를 가져가도록 하는 용도로, 대시보드 옆에서 로컬로 띄운다.
+ETag 는 (표, 형식, 월 버전) 이다. 월 버전은 그 월 표가 읽는 원본 월들의 내용 digest 라서, 다른 월만 바뀐 경우에도
+If-None-Match 가 맞으면 표를 계산하지 않고 304 를 돌려준다. 그래서 표 응답 body 에는 월 버전으로 정해지는 값만 넣는다
+(전체 데이터 버전은 /months 에서). 요청마다 원본 fingerprint(수정시각/크기)를 확인해 바뀐 part 만 다시 읽는다.
+"""
+import argparse
+import json
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pyarrow as pa
+
+from engine import compute_kpi_table, compute_product_table, source_files, source_fingerprint
+from store import load_bundle
+
+content_types = {
+    'json': 'application/json; charset=utf-8',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+table_kinds = ['kpi', 'product']
+
+
+class TableService:
+    """원본 fingerprint 가 바뀌었을 때만 다시 로드하고, 월별 표는 (기준년월, 월 버전) 단위로 보관"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.fingerprint, self.bundle, self.tables = None, None, {}
+
+    def refresh(self):
+        fingerprint = json.dumps(source_fingerprint(*(source[0] for source in source_files.values())), sort_keys=True)
+        with self.lock:
+            if fingerprint != self.fingerprint:
+                self.bundle, self.fingerprint = load_bundle(), fingerprint
+                # 월 버전이 그대로인 월의 표는 유지
+                current = set(self.bundle[5].items())
+                self.tables = {key: tables for key, tables in self.tables.items() if key in current}
+            return self.bundle
+
+    def month_tables(self, bundle, month):
+        """(KpiTable, ProductTable) - 같은 월이 동시에 처음 요청되면 두 번 계산될 수 있으나 결과는 같다"""
+        months, kpi_cube, loan_fact_by_month, _, _, month_versions = bundle
+        key = (month, month_versions[month])
+        if key not in self.tables:
+            self.tables[key] = (compute_kpi_table(kpi_cube, month), compute_product_table(kpi_cube, loan_fact_by_month, month))
+        return self.tables[key]
+
+
+def encode_table(result, fmt, metadata):
+    """표 결과 -> 응답 body. json 은 행 목록, arrow 는 schema metadata 에 월/헤더 정보"""
+    frame = result.values_frame()
+    metadata = {**metadata, 'month_header': result.month_header, 'cumulative_header': result.cumulative_header}
+    if fmt == 'json':
+        rows = json.loads(frame.to_json(orient='records', force_ascii=False, double_precision=15))
+        return json.dumps({**metadata, 'rows': rows}, ensure_ascii=False).encode()
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    table = table.replace_schema_metadata({**table.schema.metadata, **{key: str(value) for key, value in metadata.items()}})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        bundle = self.service.refresh()
+        months, _, _, _, data_version, month_versions = bundle
+
+        if url.path == '/months':
+            return self.respond(json.dumps({'data_version': data_version, 'months': months}).encode(), 'json', f'"months-{data_version}"')
+        kind = url.path.removeprefix('/tables/')
+        if not url.path.startswith('/tables/') or kind not in table_kinds:
+            return self.error(HTTPStatus.NOT_FOUND, f"경로 없음: {url.path} (/months, /tables/{{{','.join(table_kinds)}}})")
+        month, fmt = query.get('month'), query.get('format', 'json')
+        if fmt not in content_types:
+            return self.error(HTTPStatus.BAD_REQUEST, f"format 은 {', '.join(content_types)} 중 하나")
+        if month is None:
+            return self.error(HTTPStatus.BAD_REQUEST, "month=YYYYMM 파라미터 필요")
+        if month not in month_versions:
+            return self.error(HTTPStatus.NOT_FOUND, f"실적이 없는 기준년월: {month}")
+
+        etag = f'"{kind}-{fmt}-{month_versions[month]}"'
+        if self.matches(etag):
+            return self.respond(b'', fmt, etag, HTTPStatus.NOT_MODIFIED)
+        kpi_result, product_result = self.service.month_tables(bundle, month)
+        metadata = {'table': kind, 'month': month, 'month_version': month_versions[month]}
+        return self.respond(encode_table(kpi_result if kind == 'kpi' else product_result, fmt, metadata), fmt, etag)
+
+    def matches(self, etag):
+        """If-None-Match 에 etag 가 있으면 True (약한 비교, '*' 포함)"""
+        header = self.headers.get('If-None-Match')
+        if header is None:
+            return False
+        tags = [tag.strip().removeprefix('W/') for tag in header.split(',')]
+        return '*' in tags or etag in tags
+
+    def respond(self, body, fmt, etag, status=HTTPStatus.OK):
+        self.send_response(status)
+        self.send_header('ETag', etag)
+        # 캐시는 하되 매번 ETag 로 재검증
+        self.send_header('Cache-Control', 'no-cache')
+        if status != HTTPStatus.NOT_MODIFIED:
+            self.send_header('Content-Type', content_types[fmt])
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def error(self, status, message):
+        body = json.dumps({'error': message}, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_types['json'])
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="취급지표/상품별취급액 읽기 전용 API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502, help="대시보드 기본 포트(8501) 옆")
+    args = parser.parse_args()
+
+    ApiHandler.service = TableService()
+    # 첫 요청이 로드를 기다리지 않도록 미리 한 번 읽는다
+    ApiHandler.service.refresh()
+    server = ThreadingHTTPServer((args.host, args.port), ApiHandler)
+    print(f"http://{args.host}:{args.port}/months")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
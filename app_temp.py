@@ -1,31 +1,114 @@
-
+import json
+import os
 import streamlit as st
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.font_manager as fm
-
-# 한글 폰트 설정
+from engine import (MonthTableStore, compute_kpi_table, compute_product_table, compute_trend, dept_detail_sources, previous_month,
+                    read_dept_detail, scenario_keys, source_files, source_fingerprint)
+from store import load_bundle
+from render import (create_custom_table_html, create_product_loan_custom_table_html_fullstyle, export_formats,
+                    frame_to_bytes, register_korean_font, table_css, trend_chart_png)
+from profiling import SectionProfiler
+
+# 한글 폰트 설정 - 차트를 그릴 때만 matplotlib 을 불러와 프로세스당 1회 등록 (rerun 마다 반복하지 않음)
 font_path = "./NanumGothic-Regular.ttf"
-fm.fontManager.addfont(font_path)
-font_name = fm.FontProperties(fname=font_path).get_name()
-plt.rcParams['font.family'] = font_name
-plt.rcParams['axes.unicode_minus'] = False
+
+@st.cache_resource
+def korean_font():
+    return register_korean_font(font_path)
 
 # 데이터 로드
-@st.cache_data
-def load_data():
-    df_handover = pd.read_parquet('df_handover_summary_monthly.parquet')
-    df_loan_amt = pd.read_parquet('df_loan_amt_summary_monthly.parquet')
-    op_handover = pd.read_parquet('op_car_handover.parquet')
-    op_loan_amt = pd.read_parquet('op_car_loan_amt.parquet')
-    return df_handover, df_loan_amt, op_handover, op_loan_amt
+# cache_resource: 모든 세션/rerun 이 같은 객체를 공유 (cache_data 처럼 매번 복사하지 않음)
+# 반환값은 읽기 전용으로만 사용하고, 파생 컬럼/집계는 여기서 모두 만들어 둔다
+# rerun 마다 원본 (수정시각, 크기) 를 확인해 바뀌었을 때만 다시 묶는다 (서버 재시작 없이 반영)
+# 바뀐 원본 / 새 월 파티션만 다시 읽고, 나머지 part 집계는 engine 의 part 캐시를 그대로 쓴다
+def current_fingerprints():
+    return tuple((name, json.dumps(source_fingerprint(source[0]), sort_keys=True)) for name, source in source_files.items())
+
+@st.cache_resource(max_entries=2)
+def load_data(fingerprints):
+    return load_bundle()
+
+# 월별 표 계산 결과는 (기준년월, 월 버전[, OP 시나리오]) 단위로 캐시 - 원본이 바뀌어도 내용이 같은 월은 그대로 hit
+# 상품별 취급액 표는 시나리오 없이 캐시하고, 시나리오는 ProductTable.with_scenario 로 OP/달성률만 다시 계산
+@st.cache_data(max_entries=64)
+def cached_kpi_table(month, month_version, scenario, _kpi_cube):
+    return compute_kpi_table(_kpi_cube, month, scenario)
+
+@st.cache_data(max_entries=64)
+def cached_product_table(month, month_version, _kpi_cube, _loan_fact_by_month):
+    return compute_product_table(_kpi_cube, _loan_fact_by_month, month)
+
+# 전체 월 사전 계산 (DASHBOARD_WARMUP=1 일 때만) - 프로세스 전체가 데이터 버전별로 하나의 store 를 공유
+@st.cache_resource
+def warm_store_registry():
+    return {}
+
+@st.cache_resource(max_entries=2)
+def warm_month_tables(data_version, _bundle):
+    months, kpi_cube, loan_fact_by_month, _, _, month_versions = _bundle
+    registry = warm_store_registry()
+    # 직전 데이터 버전의 store 에서 월 버전이 같은 월은 다시 계산하지 않는다
+    registry['latest'] = MonthTableStore(kpi_cube, loan_fact_by_month, months, month_versions,
+                                         int(os.environ.get('DASHBOARD_WARMUP_WORKERS', '2')), registry.get('latest'))
+    return registry['latest']
+
+# 계산 중일 때만 2초마다 갱신하고, 다 끝나면 페이지 전체를 한 번 다시 실행해 polling fragment 를 없앤다
+@st.fragment(run_every="2s")
+def warmup_progress(store):
+    done, total = store.progress()
+    if done < total:
+        st.progress(done / total, text=f"월별 표 사전 계산 {done}/{total}")
+    else:
+        st.rerun()
+
+# 부서별 상세는 (파일, 월, 파일 fingerprint) 단위로만 캐시 - 펼쳐 본 조합만 메모리에 남는다
+@st.cache_data(max_entries=32)
+def load_dept_detail(name, month, fingerprint):
+    return read_dept_detail(*dept_detail_sources[name], month)
+
+@st.cache_data(max_entries=64)
+def cached_table_html(kind, month, month_version, scenario, _build):
+    """(표 종류, 기준년월, 월 버전, OP 시나리오) 별 HTML LRU 캐시 - 다른 위젯 조작으로 rerun 돼도 다시 만들지 않음"""
+    return _build()
+
+@st.cache_data(max_entries=32)
+def cached_export(kind, month, month_version, scenario, fmt, _table):
+    """(표 종류, 기준년월, 월 버전, OP 시나리오, 형식) 별 다운로드 파일 캐시 - 표 DataFrame 도 이때만 만든다"""
+    return frame_to_bytes(_table.to_frame(), fmt)
+
+@st.cache_data(max_entries=2)
+def scenario_frame(data_version, _kpi_cube):
+    """OP 시나리오 편집 표 기본값 - 조정 가능한 (상품, 부서) 별 배율 100%"""
+    return pd.DataFrame(scenario_keys(_kpi_cube), columns=['상품', '부서']).assign(배율=100.0)
+
+@st.cache_data(max_entries=2)
+def cached_trend(data_version, _kpi_cube, _months):
+    """전체 월 추이 (표, 차트 PNG) - 데이터 버전별 1회 계산/렌더"""
+    trend = compute_trend(_kpi_cube, _months)
+    korean_font()
+    return trend, trend_chart_png(trend)
+
+def export_button(kind, table):
+    """사이드바 다운로드 버튼 - data 에 callable 을 넘겨 클릭 시에만 파일을 만든다 (시나리오 적용 중이면 파일명에 표시)"""
+    suffix = '_OP시나리오' if scenario else ''
+    st.sidebar.download_button(label=f"{selected_year}년_{selected_month_num}월_{kind}{suffix}",
+    data=lambda: cached_export(kind, selected_month, month_version, scenario, export_format, table),
+    file_name=f"{selected_year}년_{selected_month_num}월_{kind}{suffix}.{export_format}",
+    mime=export_formats[export_format])
 
 # Streamlit 기본 설정
 st.set_page_config(layout="wide", page_title="현대캐피탈 Auto 본부 대시보드")
 
+# 구간별 성능 측정: ?profile=1 또는 환경변수 DASHBOARD_PROFILE=1 일 때만
+profiler = SectionProfiler(st.query_params.get('profile') == '1' or os.environ.get('DASHBOARD_PROFILE') == '1')
+
 # 데이터 로드
-df_handover, df_loan_amt, op_handover, op_loan_amt = load_data()
+with profiler.section('load_data'):
+    bundle = load_data(current_fingerprints())
+    months, kpi_cube, loan_fact_by_month, quality_report, data_version, month_versions = bundle
+
+# 사전 계산 store: 첫 렌더를 막지 않도록 작업만 등록하고, 끝난 월만 꺼내 쓴다
+warm_store = warm_month_tables(data_version, bundle) if os.environ.get('DASHBOARD_WARMUP') == '1' else None
 
 # 조합된 모듈 코드 실행
 
@@ -33,47 +116,48 @@ df_handover, df_loan_amt, op_handover, op_loan_amt = load_data()
 
 # ===== 🛠️ 공통 설정 및 사이드바 =====
 st.title("Auto 본부 사업 현황")
+st.markdown(table_css, unsafe_allow_html=True)
 
 # 사이드바 설정 - 기준년월 선택
 st.sidebar.header(" 데이터 설정")
-months = sorted(df_handover['기준년월'].unique(), reverse=True)
 selected_month = st.sidebar.selectbox("기준년월 선택", months)
+if warm_store is not None:
+    with st.sidebar:
+        done, total = warm_store.progress()
+        if done < total:
+            warmup_progress(warm_store)
+        else:
+            st.caption(f"월별 표 사전 계산 완료 ({total}개월)")
+# 데이터 점검 결과 (로드 시 데이터 버전별 1회 계산)
+if not quality_report.empty:
+    with st.sidebar.expander(f"데이터 점검 ({len(quality_report)}건)"):
+        st.dataframe(quality_report, hide_index=True)
+# OP 시나리오 (what-if) - 상품/부서별 OP 배율(%)을 바꾸면 원본/집계는 그대로 두고 OP 와 달성률/진척비만 다시 계산
+with st.sidebar.expander("OP 시나리오 (what-if)"):
+    scenario_editor = st.data_editor(scenario_frame(data_version, kpi_cube), disabled=['상품', '부서'], hide_index=True,
+                                     column_config={'배율': st.column_config.NumberColumn("OP 배율(%)", min_value=0, step=1, format="%d%%")})
+scenario = tuple(((row.상품, row.부서), row.배율 / 100) for row in scenario_editor.itertuples()
+                 if pd.notna(row.배율) and row.배율 != 100)
+if scenario:
+    st.info(f"OP 시나리오 적용 중 ({len(scenario)}개 상품/부서) - OP, 달성률, 진척비는 조정된 OP 기준입니다")
 
 # 공통 계산
 selected_year = selected_month[:4]
 selected_month_num = int(selected_month[4:])
-year_short = selected_year[2:]
+prev_month = previous_month(selected_month)
+month_version = month_versions[selected_month]
+# 사전 계산이 끝난 월이면 store 에서, 아니면 직접 계산 (월별 cache_data)
+warmed = warm_store.get(selected_month) if warm_store is not None else None
 
-# 전월 계산
-if selected_month.endswith('01'):
-    prev_month = str(int(selected_month[:4]) - 1) + '12'
-else:
-    prev_month = selected_month[:4] + str(int(selected_month[4:]) - 1).zfill(2)
-
-# 사이드바 미리보기용 간단 계산
-df_handover_month = df_handover[df_handover['기준년월'] == selected_month]
-df_halbu = df_handover_month[df_handover_month['상품구분'] == '할부']
-df_imdae = df_handover_month[df_handover_month['상품구분'] == '임대']
-
-df_halbu_rate = (df_halbu['인수율분자값'].sum() / df_halbu['인수율분모'].sum() * 100) if len(df_halbu) > 0 else 0
-df_imdae_rate = (df_imdae['인수율분자값'].sum() / df_imdae['인수율분모'].sum() * 100) if len(df_imdae) > 0 else 0
-df_total_rate = df_halbu_rate + df_imdae_rate
-
-df_loan_month = df_loan_amt[df_loan_amt['기준년월'] == selected_month]
-df_halbu_amt = df_loan_month[df_loan_month['상품구분'] == '할부']['취급액'].sum() / 1e8
-df_imdae_amt = df_loan_month[df_loan_month['상품구분'] == '임대']['취급액'].sum() / 1e8
-df_total_amt = df_halbu_amt + df_imdae_amt
-
-df_junggo_amt = df_loan_month[df_loan_month['상품구분_세부'] == '중고론']['취급액'].sum() / 1e8
-df_junggolease_amt = df_loan_month[df_loan_month['상품구분_세부'] == '중고리스']['취급액'].sum() / 1e8
-df_jaego_amt = df_loan_month[df_loan_month['상품구분_세부'] == '재고금융']['취급액'].sum() / 1e8
-df_junggo_total = df_junggo_amt + df_junggolease_amt + df_jaego_amt
+# 취급지표 표 / 사이드바 Summary 공용
+with profiler.section('취급지표 계산'):
+    kpi_result = warmed[0] if warmed and not scenario else cached_kpi_table(selected_month, month_version, scenario, kpi_cube)
 
 # 사이드바에 주요 지표 미리보기 추가
 st.sidebar.markdown("---")
 st.sidebar.markdown(f'<span style="font-size:22px; font-weight:bold;">Summary </span>',unsafe_allow_html=True)
 
-st.sidebar.markdown(f"""<span style="font-size:22px;"><b> - 신차 통합인수율 : </b></span> <span style="font-size:22px;"> {df_total_rate:.1f}%</span><br><span style="font-size:22px;"><b> - 신차 취급액 : </b></span> <span style="font-size:22px;"> {df_total_amt:,.0f}억원</span><br><span style="font-size:22px;"><b> - 취급중고 취급액 : </b></span> <span style="font-size:22px;"> {df_junggo_total:,.0f}억원</span>
+st.sidebar.markdown(f"""<span style="font-size:22px;"><b> - 신차 통합인수율 : </b></span> <span style="font-size:22px;"> {kpi_result.total('신차_통합인수율').actual:.1f}%</span><br><span style="font-size:22px;"><b> - 신차 취급액 : </b></span> <span style="font-size:22px;"> {kpi_result.total('신차_취급액').actual:,.0f}억원</span><br><span style="font-size:22px;"><b> - 취급중고 취급액 : </b></span> <span style="font-size:22px;"> {kpi_result.total('중고_취급액').actual:,.0f}억원</span>
 """, unsafe_allow_html=True)
 
 # # =====  CSS 스타일 설정 =====
@@ -93,270 +177,18 @@ st.sidebar.markdown(f"""<span style="font-size:22px;"><b> - 신차 통합인수
 st.markdown('<h2 style="font-size: 25px; margin-bottom: 0px; padding-bottom: 0px;">● 취급지표</h2>', unsafe_allow_html=True)
 st.markdown('<div style="text-align: right; font-size: 15px; color: #666; margin-top: 0px; margin-bottom: 0px; padding-top: 0px; padding-bottom: 0px;">(단위: %, 억원)</div>', unsafe_allow_html=True)
 
-# === 당월 데이터 계산 ===
-df_handover_month = df_handover[df_handover['기준년월'] == selected_month]
-df_halbu = df_handover_month[df_handover_month['상품구분'] == '할부']
-df_imdae = df_handover_month[df_handover_month['상품구분'] == '임대']
-
-# 신차 통합인수율 계산
-df_halbu_rate = (df_halbu['인수율분자값'].sum() / df_halbu['인수율분모'].sum() * 100) if len(df_halbu) > 0 else 0
-df_imdae_rate = (df_imdae['인수율분자값'].sum() / df_imdae['인수율분모'].sum() * 100) if len(df_imdae) > 0 else 0
-df_total_rate = df_halbu_rate + df_imdae_rate
-
-# 신차 취급액 계산
-df_loan_month = df_loan_amt[df_loan_amt['기준년월'] == selected_month]
-df_halbu_amt = df_loan_month[df_loan_month['상품구분'] == '할부']['취급액'].sum() / 1e8
-df_imdae_amt = df_loan_month[df_loan_month['상품구분'] == '임대']['취급액'].sum() / 1e8
-df_total_amt = df_halbu_amt + df_imdae_amt
-
-# 중고 취급액 계산
-df_junggo_amt = df_loan_month[df_loan_month['상품구분_세부'] == '중고론']['취급액'].sum() / 1e8
-df_junggolease_amt = df_loan_month[df_loan_month['상품구분_세부'] == '중고리스']['취급액'].sum() / 1e8
-df_jaego_amt = df_loan_month[df_loan_month['상품구분_세부'] == '재고금융']['취급액'].sum() / 1e8
-df_junggo_total = df_junggo_amt + df_junggolease_amt + df_jaego_amt
-
-# === OP 데이터 계산 ===
-op_handover_month = op_handover[op_handover['bas_yrmn'] == selected_month]
-op_halbu = op_handover_month[op_handover_month['product'] == '할부']
-op_imdae = op_handover_month[op_handover_month['product'] == '임대']
-
-op_halbu_rate = (op_halbu['numerator'].sum() / op_halbu['denominator'].sum() * 100) if len(op_halbu) > 0 else 0
-op_imdae_rate = (op_imdae['numerator'].sum() / op_imdae['denominator'].sum() * 100) if len(op_imdae) > 0 else 0
-op_total_rate = op_halbu_rate + op_imdae_rate
-
-op_loan_month = op_loan_amt[op_loan_amt['bas_yrmn'] == selected_month]
-op_halbu_amt = op_loan_month[op_loan_month['product'].isin(['할부','할부연장'])]['value'].sum()
-op_imdae_amt = op_loan_month[op_loan_month['product'].isin(['임대신규','임대연장'])]['value'].sum()
-op_total_amt = op_halbu_amt + op_imdae_amt
-
-op_junggo_amt = op_loan_month[op_loan_month['product'] == '중고론']['value'].sum()
-op_junggolease_amt = op_loan_month[op_loan_month['product'] == '중고리스']['value'].sum()
-op_jaego_amt = op_loan_month[op_loan_month['product'] == '재고금융']['value'].sum()
-op_junggo_total = op_junggo_amt + op_junggolease_amt + op_jaego_amt
-
-# 달성률 계산
-## 인수율
-df_total_rate_progress = (df_total_rate / op_total_rate *100) if op_total_rate>0 else 0
-df_halbu_rate_progress = (df_halbu_rate / op_halbu_rate *100) if op_halbu_rate>0 else 0
-df_imdae_rate_progress = (df_imdae_rate / op_imdae_rate *100) if op_imdae_rate>0 else 0
- 
-## 취급액  
-total_progress = (df_total_amt / op_total_amt * 100) if op_total_amt > 0 else 0
-halbu_progress = (df_halbu_amt / op_halbu_amt * 100) if op_halbu_amt > 0 else 0
-imdae_progress = (df_imdae_amt / op_imdae_amt * 100) if op_imdae_amt > 0 else 0
-junggo_total_progress = (df_junggo_total  / op_junggo_total * 100) if op_junggo_total > 0 else 0
-junggo_progress = (df_junggo_amt  / op_junggo_amt * 100) if op_junggo_amt > 0 else 0
-junggolease_progress = (df_junggolease_amt  / op_junggolease_amt * 100) if op_junggolease_amt > 0 else 0
-jaego_progress = (df_jaego_amt  / op_jaego_amt * 100) if op_jaego_amt > 0 else 0
-
-# 진척비
-total_wd = total_progress-100
-halbu_wd = halbu_progress-100
-imdae_wd = imdae_progress-100
-junggo_total_wd = junggo_total_progress-100
-junggo_wd = junggo_progress-100
-junggolease_wd = junggolease_progress-100
-jaego_wd = jaego_progress-100
- 
-
-# === 전월 데이터 계산 ===
-prev_df_handover = df_handover[df_handover['기준년월'] == prev_month]
-prev_halbu = prev_df_handover[prev_df_handover['상품구분'] == '할부']
-prev_imdae = prev_df_handover[prev_df_handover['상품구분'] == '임대']
-
-prev_halbu_rate = (prev_halbu['인수율분자값'].sum() / prev_halbu['인수율분모'].sum() * 100) if len(prev_halbu) > 0 else 0
-prev_imdae_rate = (prev_imdae['인수율분자값'].sum() / prev_imdae['인수율분모'].sum() * 100) if len(prev_imdae) > 0 else 0
-prev_total_rate = prev_halbu_rate + prev_imdae_rate
-
-prev_df_loan = df_loan_amt[df_loan_amt['기준년월'] == prev_month]
-prev_halbu_amt = prev_df_loan[prev_df_loan['상품구분'] == '할부']['취급액'].sum() / 1e8
-prev_imdae_amt = prev_df_loan[prev_df_loan['상품구분'] == '임대']['취급액'].sum() / 1e8
-prev_total_amt = prev_halbu_amt + prev_imdae_amt
-
-prev_junggo_amt = prev_df_loan[prev_df_loan['상품구분_세부'] == '중고론']['취급액'].sum() / 1e8
-prev_junggolease_amt = prev_df_loan[prev_df_loan['상품구분_세부'] == '중고리스']['취급액'].sum() / 1e8
-prev_jaego_amt = prev_df_loan[prev_df_loan['상품구분_세부'] == '재고금융']['취급액'].sum() / 1e8
-prev_junggo_total = prev_junggo_amt + prev_junggolease_amt + prev_jaego_amt
-
-# === 누적 데이터 계산 ===
-cumulative_months = [f"{selected_year}{str(i).zfill(2)}" for i in range(1, selected_month_num + 1)]
-
-# 누적 신차 통합인수율
-cumulative_op_handover = op_handover[op_handover['bas_yrmn'].isin(cumulative_months)]
-cumulative_op_halbu = cumulative_op_handover[cumulative_op_handover['product'] == '할부']
-cumulative_op_imdae = cumulative_op_handover[cumulative_op_handover['product'] == '임대']
-
-cumulative_op_halbu_rate = (cumulative_op_halbu['numerator'].sum() / cumulative_op_halbu['denominator'].sum() * 100) if len(cumulative_op_halbu) > 0 else 0
-cumulative_op_imdae_rate = (cumulative_op_imdae['numerator'].sum() / cumulative_op_imdae['denominator'].sum() * 100) if len(cumulative_op_imdae) > 0 else 0
-cumulative_op_total_rate = cumulative_op_halbu_rate + cumulative_op_imdae_rate
-
-cumulative_df_handover = df_handover[df_handover['기준년월'].isin(cumulative_months)]
-cumulative_df_halbu = cumulative_df_handover[cumulative_df_handover['상품구분'] == '할부']
-cumulative_df_imdae = cumulative_df_handover[cumulative_df_handover['상품구분'] == '임대']
-
-cumulative_df_halbu_rate = (cumulative_df_halbu['인수율분자값'].sum() / cumulative_df_halbu['인수율분모'].sum() * 100) if len(cumulative_df_halbu) > 0 else 0
-cumulative_df_imdae_rate = (cumulative_df_imdae['인수율분자값'].sum() / cumulative_df_imdae['인수율분모'].sum() * 100) if len(cumulative_df_imdae) > 0 else 0
-cumulative_df_total_rate = cumulative_df_halbu_rate + cumulative_df_imdae_rate
-
-cumulative_halbu_achievement = (cumulative_df_halbu_rate / cumulative_op_halbu_rate * 100) if cumulative_op_halbu_rate > 0 else 0
-cumulative_imdae_achievement = (cumulative_df_imdae_rate / cumulative_op_imdae_rate * 100) if cumulative_op_imdae_rate > 0 else 0
-cumulative_total_achievement = (cumulative_df_total_rate / cumulative_op_total_rate * 100) if cumulative_op_total_rate > 0 else 0
-
-# 누적 신차 취급액
-cumulative_op_loan = op_loan_amt[op_loan_amt['bas_yrmn'].isin(cumulative_months)]
-cumulative_op_halbu_amt = cumulative_op_loan[cumulative_op_loan['product'].isin(['할부','할부연장'])]['value'].sum()
-cumulative_op_imdae_amt = cumulative_op_loan[cumulative_op_loan['product'].isin(['임대신규','임대연장'])]['value'].sum()
-cumulative_op_total_amt = cumulative_op_halbu_amt + cumulative_op_imdae_amt
-
-cumulative_df_loan = df_loan_amt[df_loan_amt['기준년월'].isin(cumulative_months)]
-cumulative_df_halbu_amt = cumulative_df_loan[cumulative_df_loan['상품구분'] == '할부']['취급액'].sum() / 1e8
-cumulative_df_imdae_amt = cumulative_df_loan[cumulative_df_loan['상품구분'] == '임대']['취급액'].sum() / 1e8
-cumulative_df_total_amt = cumulative_df_halbu_amt + cumulative_df_imdae_amt
-
-cumulative_halbu_amt_achievement = (cumulative_df_halbu_amt / cumulative_op_halbu_amt * 100) if cumulative_op_halbu_amt > 0 else 0
-cumulative_imdae_amt_achievement = (cumulative_df_imdae_amt / cumulative_op_imdae_amt * 100) if cumulative_op_imdae_amt > 0 else 0
-cumulative_total_amt_achievement = (cumulative_df_total_amt / cumulative_op_total_amt * 100) if cumulative_op_total_amt > 0 else 0
-
-# 누적 중고 취급액
-cumulative_op_junggo_amt = cumulative_op_loan[cumulative_op_loan['product'] == '중고론']['value'].sum()
-cumulative_op_junggolease_amt = cumulative_op_loan[cumulative_op_loan['product'] == '중고리스']['value'].sum()
-cumulative_op_jaego_amt = cumulative_op_loan[cumulative_op_loan['product'] == '재고금융']['value'].sum()
-cumulative_op_junggo_total = cumulative_op_junggo_amt + cumulative_op_junggolease_amt + cumulative_op_jaego_amt
-
-cumulative_df_junggo_amt = cumulative_df_loan[cumulative_df_loan['상품구분_세부'] == '중고론']['취급액'].sum() / 1e8
-cumulative_df_junggolease_amt = cumulative_df_loan[cumulative_df_loan['상품구분_세부'] == '중고리스']['취급액'].sum() / 1e8
-cumulative_df_jaego_amt = cumulative_df_loan[cumulative_df_loan['상품구분_세부'] == '재고금융']['취급액'].sum() / 1e8
-cumulative_df_junggo_total = cumulative_df_junggo_amt + cumulative_df_junggolease_amt + cumulative_df_jaego_amt
-
-cumulative_junggo_total_achievement = (cumulative_df_junggo_total / cumulative_op_junggo_total * 100) if cumulative_op_junggo_total > 0 else 0
-cumulative_junggo_achievement = (cumulative_df_junggo_amt / cumulative_op_junggo_amt * 100) if cumulative_op_junggo_amt > 0 else 0
-cumulative_junggolease_achievement = (cumulative_df_junggolease_amt / cumulative_op_junggolease_amt * 100) if cumulative_op_junggolease_amt > 0 else 0
-cumulative_jaego_achievement = (cumulative_df_jaego_amt / cumulative_op_jaego_amt * 100) if cumulative_op_jaego_amt > 0 else 0
-
-# === 표 헤더 생성 ===
-dynamic_month_header = f"당월('{year_short}.{selected_month_num}월)"
-dynamic_cumulative_header = f"누적('{year_short}.1~{selected_month_num}월)"
-
-# === 표 데이터 생성 ===
-combined_data = {
-    ('구분', ''): ['신차_통합인수율', '• 할부', '• 임대', '신차_취급액', '• 할부', '• 임대', '중고_취급액', '• 중고론', '• 중고리스', '• 재고금융'],
-    (dynamic_month_header, 'OP'): [
-        f"{op_total_rate:.1f}%", f"{op_halbu_rate:.1f}%", f"{op_imdae_rate:.1f}%",
-        f"{op_total_amt:,.0f}", f"{op_halbu_amt:,.0f}", f"{op_imdae_amt:,.0f}",
-        f"{op_junggo_total:,.0f}", f"{op_junggo_amt:,.0f}", f"{op_junggolease_amt:,.0f}", f"{op_jaego_amt:,.0f}"
-    ],
-    (dynamic_month_header, '실적'): [
-        f"{df_total_rate:.1f}%", f"{df_halbu_rate:.1f}%", f"{df_imdae_rate:.1f}%",
-        f"{df_total_amt:,.0f}", f"{df_halbu_amt:,.0f}", f"{df_imdae_amt:,.0f}",
-        f"{df_junggo_total:,.0f}", f"{df_junggo_amt:,.0f}", f"{df_junggolease_amt:,.0f}", f"{df_jaego_amt:,.0f}"
-    ],
-    (dynamic_month_header, '달성률'): [
-        f"{df_total_rate_progress:+.1f}%", f"{df_halbu_rate_progress:+.1f}%", f"{df_imdae_rate_progress:+.1f}%",
-        f"{total_progress:+.1f}%", f"{halbu_progress:+.1f}%", f"{imdae_progress:+.1f}%",
-        f"{junggo_total_progress:+.1f}%", f"{junggo_progress:+.1f}%", f"{junggolease_progress:+.1f}%", f"{jaego_progress:+.1f}%"
-    ],
-    (dynamic_month_header, '진척비'): [
-        '-', '-', '-',
-        f"{total_wd:+.1f}%", f"{halbu_wd:+.1f}%", f"{imdae_wd:+.1f}%",
-        f"{junggo_total_wd:+.1f}%", f"{junggo_wd:+.1f}%", f"{junggolease_wd:+.1f}%", f"{jaego_wd:+.1f}%"
-    ],
-    (dynamic_month_header, '전월대비'): [
-        f"{df_total_rate - prev_total_rate:+.1f}%p",
-        f"{df_halbu_rate - prev_halbu_rate:+.1f}%p",
-        f"{df_imdae_rate - prev_imdae_rate:+.1f}%p",
-        f"{df_total_amt - prev_total_amt:+,.0f}",
-        f"{df_halbu_amt - prev_halbu_amt:+,.0f}",
-        f"{df_imdae_amt - prev_imdae_amt:+,.0f}",
-        f"{df_junggo_total - prev_junggo_total:+,.0f}",
-        f"{df_junggo_amt - prev_junggo_amt:+,.0f}",
-        f"{df_junggolease_amt - prev_junggolease_amt:+,.0f}",
-        f"{df_jaego_amt - prev_jaego_amt:+,.0f}"
-    ],
-    (dynamic_cumulative_header, '누적OP'): [
-        f"{cumulative_op_total_rate:.1f}%", f"{cumulative_op_halbu_rate:.1f}%", f"{cumulative_op_imdae_rate:.1f}%",
-        f"{cumulative_op_total_amt:,.0f}", f"{cumulative_op_halbu_amt:,.0f}", f"{cumulative_op_imdae_amt:,.0f}",
-        f"{cumulative_op_junggo_total:,.0f}", f"{cumulative_op_junggo_amt:,.0f}", f"{cumulative_op_junggolease_amt:,.0f}", f"{cumulative_op_jaego_amt:,.0f}"
-    ],
-    (dynamic_cumulative_header, '누적실적'): [
-        f"{cumulative_df_total_rate:.1f}%", f"{cumulative_df_halbu_rate:.1f}%", f"{cumulative_df_imdae_rate:.1f}%",
-        f"{cumulative_df_total_amt:,.0f}", f"{cumulative_df_halbu_amt:,.0f}", f"{cumulative_df_imdae_amt:,.0f}",
-        f"{cumulative_df_junggo_total:,.0f}", f"{cumulative_df_junggo_amt:,.0f}", f"{cumulative_df_junggolease_amt:,.0f}", f"{cumulative_df_jaego_amt:,.0f}"
-    ],
-    (dynamic_cumulative_header, '누적달성률'): [
-        f"{cumulative_total_achievement:.1f}%", f"{cumulative_halbu_achievement:.1f}%", f"{cumulative_imdae_achievement:.1f}%",
-        f"{cumulative_total_amt_achievement:.1f}%", f"{cumulative_halbu_amt_achievement:.1f}%", f"{cumulative_imdae_amt_achievement:.1f}%",
-        f"{cumulative_junggo_total_achievement:.1f}%", f"{cumulative_junggo_achievement:.1f}%", f"{cumulative_junggolease_achievement:.1f}%", f"{cumulative_jaego_achievement:.1f}%"
-    ]
-}
-
-# === 표 렌더링, download ===
-df_display = pd.DataFrame(combined_data)
-df_display.columns = pd.MultiIndex.from_tuples(df_display.columns)
-
-
 st.sidebar.markdown("---")
 st.sidebar.markdown(
     f'<span style="font-size:22px; font-weight:bold;"> > download summary < </span>',
     unsafe_allow_html=True)
 
-import io
-excel_buffer = io.BytesIO()
-df_display.to_excel(excel_buffer, index=True)
-excel_buffer.seek(0)
-st.sidebar.download_button(label=f"{selected_year}년_{selected_month_num}월_취급지표",
-data=excel_buffer,file_name=f"{selected_year}년_{selected_month_num}월_취급지표.xlsx",
-mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-
-
-def create_custom_table_html(df):
-    html = f"""
-    <div style="overflow-x: auto; margin: 0px; padding: 0px;">
-        <table style="width: 100%; border-collapse: collapse; border: 2px solid #2563eb; border-top: 3px solid #000000; border-bottom: 3px solid #000000; border-radius: 10px; overflow: hidden; box-shadow: 0 6px 15px rgba(0,0,0,0.15); margin: 0px;">
-            <thead>
-                <tr>
-                    <th rowspan="2" style="background: #1e40af; color: white; font-weight: bold; font-size: 20px; text-align: center; vertical-align: middle; padding: 14px 8px; border: 2px solid #ffffff; text-shadow: 1px 1px 3px rgba(0,0,0,0.4);">구분</th>
-                    <th colspan="5" style="background: #1e40af; color: white; font-weight: bold; font-size: 20px; text-align: center; vertical-align: middle; padding: 14px 8px; border: 2px solid #ffffff; text-shadow: 1px 1px 3px rgba(0,0,0,0.4);">{dynamic_month_header}</th>
-                    <th colspan="3" style="background: #1e40af; color: white; font-weight: bold; font-size: 20px; text-align: center; vertical-align: middle; padding: 14px 8px; border: 2px solid #ffffff; text-shadow: 1px 1px 3px rgba(0,0,0,0.4);">{dynamic_cumulative_header}</th>
-                </tr>
-                <tr>
-                    <th style="background: #2563eb; color: white; font-weight: bold; font-size: 20px; text-align: center; vertical-align: middle; padding: 10px 6px; border: 1px solid #ffffff;">OP</th>
-                    <th style="background: #2563eb; color: white; font-weight: bold; font-size: 20px; text-align: center; vertical-align: middle; padding: 10px 6px; border: 1px solid #ffffff;">실적</th>
-                    <th style="background: #2563eb; color: white; font-weight: bold; font-size: 20px; text-align: center; vertical-align: middle; padding: 10px 6px; border: 1px solid #ffffff;">달성률</th>
-                    <th style="background: #2563eb; color: white; font-weight: bold; font-size: 20px; text-align: center; vertical-align: middle; padding: 10px 6px; border: 1px solid #ffffff;">진척비</th>
-                    <th style="background: #2563eb; color: white; font-weight: bold; font-size: 20px; text-align: center; vertical-align: middle; padding: 10px 6px; border: 1px solid #ffffff;">전월대비</th>
-                    <th style="background: #2563eb; color: white; font-weight: bold; font-size: 20px; text-align: center; vertical-align: middle; padding: 10px 6px; border: 1px solid #ffffff;">누적OP</th>
-                    <th style="background: #2563eb; color: white; font-weight: bold; font-size: 20px; text-align: center; vertical-align: middle; padding: 10px 6px; border: 1px solid #ffffff;">누적실적</th>
-                    <th style="background: #2563eb; color: white; font-weight: bold; font-size: 20px; text-align: center; vertical-align: middle; padding: 10px 6px; border: 1px solid #ffffff;">누적달성률</th>
-                </tr>
-            </thead>
-            <tbody>
-    """
-    
-    row_names = ['신차_통합인수율', '• 할부', '• 임대', '신차_취급액', '• 할부', '• 임대', '중고_취급액', '• 중고론', '• 중고리스', '• 재고금융']
-    
-    for i, row_name in enumerate(row_names):
-        if i in [0, 3, 6]:
-            row_style = "background-color: #bfdbfe; color: #1e40af; font-weight: bold;"
-        else:
-            row_style = "background-color: white; color: black;"
-            
-        html += f'<tr>'
-        html += f'<td style="{row_style} text-align: center; vertical-align: middle; padding: 8px; border: 1px solid #dbeafe; font-size: 20px;">{row_name}</td>'
-        
-        for col_key in [(dynamic_month_header, 'OP'), (dynamic_month_header, '실적'), (dynamic_month_header, '달성률'), (dynamic_month_header, '진척비'), (dynamic_month_header, '전월대비'), (dynamic_cumulative_header, '누적OP'), (dynamic_cumulative_header, '누적실적'), (dynamic_cumulative_header, '누적달성률')]:
-            value = combined_data[col_key][i]
-            html += f'<td style="{row_style} text-align: center; vertical-align: middle; padding: 8px; border: 1px solid #dbeafe; font-size: 20px;">{value}</td>'
-        
-        html += '</tr>'
-    
-    html += """
-            </tbody>
-        </table>
-    </div>
-    """
-    return html
-
-custom_table_html = create_custom_table_html(df_display)
+export_format = st.sidebar.radio("다운로드 형식", list(export_formats), horizontal=True)
+with profiler.section('취급지표 다운로드 준비'):
+    export_button('취급지표', kpi_result)
+
+
+with profiler.section('취급지표 HTML'):
+    custom_table_html = cached_table_html('취급지표', selected_month, month_version, scenario, lambda: create_custom_table_html(kpi_result))
 st.markdown(custom_table_html, unsafe_allow_html=True)
 
 
@@ -366,385 +198,17 @@ st.markdown(custom_table_html, unsafe_allow_html=True)
 st.markdown('<h2 style="font-size: 25px; margin-bottom: 0px; padding-bottom: 0px;">● 상품별 취급액</h2>', unsafe_allow_html=True)
 st.markdown('<div style="text-align: right; font-size: 15px; color: #666; margin-top: 0px; margin-bottom: 0px; padding-top: 0px; padding-bottom: 0px;">(단위: %, 억원)</div>', unsafe_allow_html=True)
 
-op_loan_amt.insert(0, '구분1' ,np.where(op_loan_amt['product'].isin(['중고론', '중고리스', '재고금융']), '중고','신차'))
-op_loan_amt.insert(1 ,'구분2' ,np.where(op_loan_amt['product'].isin(['할부', '할부연장']), '할부',
-                                  np.where(op_loan_amt['product'].isin(['임대신규', '임대연장']), '임대',op_loan_amt['product'])))
-op_loan_amt.insert(2 ,'구분3' ,np.where(op_loan_amt['product'].isin(['임대신규','임대연장']), op_loan_amt['product'], op_loan_amt['depart']))
-op_loan_amt.insert(3 ,'구분4' ,op_loan_amt['depart'])
-df_loan_amt.insert(0, '구분1' ,np.where(df_loan_amt['상품구분'].isin(['할부', '임대']), '신차','중고'))
-df_loan_amt.insert(1 ,'구분2' ,np.where(df_loan_amt['상품구분'].isin(['중고']), df_loan_amt['상품구분_세부'], df_loan_amt['상품구분']))
-df_loan_amt.insert(2 ,'구분3' ,np.where(df_loan_amt['상품구분'].isin(['임대']), df_loan_amt['상품구분_세부'], df_loan_amt['부서']))
-df_loan_amt.insert(3 ,'구분4' ,df_loan_amt['부서'])
-
-groups = ['구분1', '구분2', '구분3', '구분4']
-def custom_sort_key(row):
-    구분1 = row['구분1']
-    구분2 = row['구분2']
-    구분3 = row['구분3']
-    구분4 = row['구분4']
-    if 구분1 == '신차':
-        sort1 = 0
-    else: 
-        sort1 = 1
-
-    if 구분2 == '할부':
-        sort2 = 0
-    elif 구분3 == '임대신규':
-        sort2 = 1
-    elif 구분3 == '임대연장':
-        sort2 = 2   
-    elif 구분2 == '중고론':
-        sort2 = 3
-    elif 구분2 == '중고리스':
-        sort2 = 4
-    else:
-        sort2 = 5
-
-    if 구분1 == '신차' and 구분4 == '신차영업팀':
-        sort3 = 0
-    elif 구분1 == '신차' and 구분4 == '플랫폼영업팀':
-        sort3 = 1
-    elif 구분1 == '신차' and 구분4 == 'Auto법인마케팅팀':
-        sort3 = 2
-    elif 구분1 == '중고' and 구분4 == '중고영업팀':
-        sort3 = 3
-    elif 구분1 == '중고' and 구분4 == '플랫폼영업팀':
-        sort3 = 4
-    elif 구분1 == '중고' and 구분4 == 'Auto법인마케팅팀':
-        sort3 = 5   
-
-    return (sort1, sort2, sort3)
-
-
-# === 당월 데이터 계산 ===
-current_loan_data = df_loan_amt[df_loan_amt['기준년월'] == selected_month].groupby(groups)['취급액'].sum().reset_index()
-current_loan_data['sort_key'] = current_loan_data.apply(custom_sort_key, axis=1)
-current_loan_data = current_loan_data.sort_values('sort_key').drop('sort_key', axis=1)
-
-
-신차_취급액_합 = current_loan_data[current_loan_data['구분1'] == '신차']['취급액'].sum() if '구분1' in current_loan_data.columns else None
-row = ['신차', 'total', 'total', 'total', 신차_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','취급액'])
-current_loan_data = pd.concat([row_df, current_loan_data], ignore_index=True)
-
-중고_취급액_합 = current_loan_data[current_loan_data['구분1'] == '중고']['취급액'].sum() if '구분1' in current_loan_data.columns else None
-row = ['중고', 'total', 'total', 'total', 중고_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','취급액'])
-current_loan_data = pd.concat([current_loan_data[:10],row_df, current_loan_data[10:]], ignore_index=True)
-
-임대_취급액_합 = current_loan_data[current_loan_data['구분2'] == '임대']['취급액'].sum() if '구분2' in current_loan_data.columns else None
-row = ['신차', '임대', 'total', 'total', 임대_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','취급액'])
-current_loan_data = pd.concat([current_loan_data[:4],row_df, current_loan_data[4:]], ignore_index=True)
-
-
-임대신규_취급액_합 = current_loan_data[current_loan_data['구분3'] == '임대신규']['취급액'].sum() if '구분3' in current_loan_data.columns else None
-row = ['신차', '임대', '임대신규', 'total', 임대신규_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','취급액'])
-current_loan_data = pd.concat([current_loan_data[:5],row_df, current_loan_data[5:]], ignore_index=True)
-
-
-임대연장_취급액_합 = current_loan_data[current_loan_data['구분3'] == '임대연장']['취급액'].sum() if '구분3' in current_loan_data.columns else None
-row = ['신차', '임대', '임대연장', 'total', 임대연장_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','취급액'])
-current_loan_data = pd.concat([current_loan_data[:9],row_df, current_loan_data[9:]], ignore_index=True)
-
-#7.24 추가 
-할부_취급액_합 = current_loan_data[current_loan_data['구분2'] == '할부']['취급액'].sum() if '구분2' in current_loan_data.columns else None
-row = ['신차', '할부', 'total', 'total', 할부_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','취급액'])
-current_loan_data = pd.concat([current_loan_data[:1],row_df, current_loan_data[1:]], ignore_index=True)
-
-
-# 당월 OP 데이터와 병합
-current_op_result = op_loan_amt[op_loan_amt['bas_yrmn'] == selected_month].groupby(groups)['value'].sum().reset_index()
-current_op_result['sort_key'] = current_op_result.apply(custom_sort_key, axis=1)
-current_op_result = current_op_result.sort_values('sort_key').drop('sort_key', axis=1)
-current_op_result.drop(columns=['bas_yrmn', 'product','depart'], inplace=True, errors='ignore')
-
-신차_취급액_합 = current_op_result[current_op_result['구분1'] == '신차']['value'].sum() if '구분1' in current_op_result.columns else None
-row = ['신차', 'total', 'total', 'total', 신차_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','value'])
-current_op_result = pd.concat([row_df, current_op_result], ignore_index=True)
-
-중고_취급액_합 = current_op_result[current_op_result['구분1'] == '중고']['value'].sum() if '구분1' in current_op_result.columns else None
-row = ['중고', 'total', 'total', 'total', 중고_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','value'])
-current_op_result = pd.concat([current_op_result[:10],row_df, current_op_result[10:]], ignore_index=True)
-
-
-임대_취급액_합 = current_op_result[current_op_result['구분2'] == '임대']['value'].sum() if '구분2' in current_op_result.columns else None
-row = ['신차', '임대', 'total', 'total', 임대_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','value'])
-current_op_result = pd.concat([current_op_result[:4],row_df, current_op_result[4:]], ignore_index=True)
-
-
-임대신규_취급액_합 = current_op_result[current_op_result['구분3'] == '임대신규']['value'].sum() if '구분3' in current_op_result.columns else None
-row = ['신차', '임대', '임대신규', 'total', 임대신규_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','value'])
-current_op_result = pd.concat([current_op_result[:5],row_df, current_op_result[5:]], ignore_index=True)
-
-
-임대연장_취급액_합 = current_op_result[current_op_result['구분3'] == '임대연장']['value'].sum() if '구분3' in current_op_result.columns else None
-row = ['신차', '임대', '임대연장', 'total', 임대연장_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','value'])
-current_op_result = pd.concat([current_op_result[:9],row_df, current_op_result[9:]], ignore_index=True)
-current_op_result.drop(columns=['bas_yrmn', 'product','depart'], inplace=True, errors='ignore')
-
-#7.24 추가
-할부_취급액_합 = current_op_result[current_op_result['구분2'] == '할부']['value'].sum() if '구분2' in current_op_result.columns else None
-row = ['신차', '할부', 'total', 'total', 할부_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','value'])
-current_op_result = pd.concat([current_op_result[:1],row_df, current_op_result[1:]], ignore_index=True)
-current_op_result.drop(columns=['bas_yrmn', 'product','depart'], inplace=True, errors='ignore')
-
-
-current_loan_result = pd.merge(current_loan_data, current_op_result, 
-   left_on=['구분1','구분2','구분3','구분4'], right_on=['구분1','구분2','구분3','구분4'], 
-   how='inner').rename(columns={'취급액': '취급액', 'value': 'OP_취급액'}).reset_index(drop=True)
-
-
-# === 전월 데이터 계산 ===
-prev_loan_data = df_loan_amt[df_loan_amt['기준년월'] == prev_month].groupby(groups)['취급액'].sum().reset_index()
-prev_loan_data['sort_key'] = prev_loan_data.apply(custom_sort_key, axis=1)
-prev_loan_data = prev_loan_data.sort_values('sort_key').drop('sort_key', axis=1)
-
-
-신차_취급액_합 = prev_loan_data[prev_loan_data['구분1'] == '신차']['취급액'].sum() if '구분1' in prev_loan_data.columns else None
-row = ['신차', 'total', 'total', 'total', 신차_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','취급액'])
-prev_loan_data = pd.concat([row_df, prev_loan_data], ignore_index=True)
-
-중고_취급액_합 = prev_loan_data[prev_loan_data['구분1'] == '중고']['취급액'].sum() if '구분1' in prev_loan_data.columns else None
-row = ['중고', 'total', 'total', 'total', 중고_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','취급액'])
-prev_loan_data = pd.concat([prev_loan_data[:10],row_df, prev_loan_data[10:]], ignore_index=True)
-
-임대_취급액_합 = prev_loan_data[prev_loan_data['구분2'] == '임대']['취급액'].sum() if '구분2' in prev_loan_data.columns else None
-row = ['신차', '임대', 'total', 'total', 임대_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','취급액'])
-prev_loan_data = pd.concat([prev_loan_data[:4],row_df, prev_loan_data[4:]], ignore_index=True)
-
-
-임대신규_취급액_합 = prev_loan_data[prev_loan_data['구분3'] == '임대신규']['취급액'].sum() if '구분3' in prev_loan_data.columns else None
-row = ['신차', '임대', '임대신규', 'total', 임대신규_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','취급액'])
-prev_loan_data = pd.concat([prev_loan_data[:5],row_df, prev_loan_data[5:]], ignore_index=True)
-
+with profiler.section('상품별 취급액 계산'):
+    product_result = warmed[1] if warmed else cached_product_table(selected_month, month_version, kpi_cube, loan_fact_by_month)
+    product_result = product_result.with_scenario(scenario)
 
-임대연장_취급액_합 = prev_loan_data[prev_loan_data['구분3'] == '임대연장']['취급액'].sum() if '구분3' in prev_loan_data.columns else None
-row = ['신차', '임대', '임대연장', 'total', 임대연장_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','취급액'])
-prev_loan_data = pd.concat([prev_loan_data[:9],row_df, prev_loan_data[9:]], ignore_index=True)
+# 당월/전월 데이터 점검 결과 (구분 값, 실적/OP 한쪽에만 있는 키 등)
+month_issues = quality_report[quality_report['기준년월'].isin([selected_month, prev_month])]
+if not month_issues.empty:
+    st.warning('데이터 점검: ' + ', '.join(f"{row['기준년월']} {row['원본']} {row['내용']}" for _, row in month_issues.iterrows()))
 
-#7.24 추가 
-할부_취급액_합 = prev_loan_data[prev_loan_data['구분2'] == '할부']['취급액'].sum() if '구분2' in prev_loan_data.columns else None
-row = ['신차', '할부', 'total', 'total', 할부_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','취급액'])
-prev_loan_data = pd.concat([prev_loan_data[:1],row_df, prev_loan_data[1:]], ignore_index=True)
-
-# # 전월 OP 데이터와 병합
-prev_op_result = op_loan_amt[op_loan_amt['bas_yrmn'] == prev_month].groupby(groups)['value'].sum().reset_index()
-prev_op_result['sort_key'] = prev_op_result.apply(custom_sort_key, axis=1)
-prev_op_result = prev_op_result.sort_values('sort_key').drop('sort_key', axis=1)
-prev_op_result.drop(columns=['bas_yrmn', 'product','depart'], inplace=True, errors='ignore')
-
-신차_취급액_합 = prev_op_result[prev_op_result['구분1'] == '신차']['value'].sum() if '구분1' in prev_op_result.columns else None
-row = ['신차', 'total', 'total', 'total', 신차_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','value'])
-prev_op_result = pd.concat([row_df, prev_op_result], ignore_index=True)
-
-중고_취급액_합 = prev_op_result[prev_op_result['구분1'] == '중고']['value'].sum() if '구분1' in prev_op_result.columns else None
-row = ['중고', 'total', 'total', 'total', 중고_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','value'])
-prev_op_result = pd.concat([prev_op_result[:10],row_df, prev_op_result[10:]], ignore_index=True)
-
-
-임대_취급액_합 = prev_op_result[prev_op_result['구분2'] == '임대']['value'].sum() if '구분2' in prev_op_result.columns else None
-row = ['신차', '임대', 'total', 'total', 임대_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','value'])
-prev_op_result = pd.concat([prev_op_result[:4],row_df, prev_op_result[4:]], ignore_index=True)
-
-
-임대신규_취급액_합 = prev_op_result[prev_op_result['구분3'] == '임대신규']['value'].sum() if '구분3' in prev_op_result.columns else None
-row = ['신차', '임대', '임대신규', 'total', 임대신규_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','value'])
-prev_op_result = pd.concat([prev_op_result[:5],row_df, prev_op_result[5:]], ignore_index=True)
-
-
-임대연장_취급액_합 = prev_op_result[prev_op_result['구분3'] == '임대연장']['value'].sum() if '구분3' in prev_op_result.columns else None
-row = ['신차', '임대', '임대연장', 'total', 임대연장_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','value'])
-prev_op_result = pd.concat([prev_op_result[:9],row_df, prev_op_result[9:]], ignore_index=True)
-prev_op_result.drop(columns=['bas_yrmn', 'product','depart'], inplace=True, errors='ignore')
-
-#7.24 추가 
-할부_취급액_합 = prev_op_result[prev_op_result['구분3'] == '할부']['value'].sum() if '구분2' in prev_op_result.columns else None
-row = ['신차', '할부', 'total', 'total', 할부_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','value'])
-prev_op_result = pd.concat([prev_op_result[:9],row_df, prev_op_result[9:]], ignore_index=True)
-prev_op_result.drop(columns=['bas_yrmn', 'product','depart'], inplace=True, errors='ignore')
-
-
-prev_loan_result = pd.merge(prev_loan_data, prev_op_result, 
-   left_on=['구분1','구분2','구분3','구분4'], right_on=['구분1','구분2','구분3','구분4'], 
-   how='inner').rename(columns={'취급액': '취급액', 'value': 'OP_취급액'}).reset_index(drop=True)
-
-# === 누적 데이터 계산 ===
-cumulative_months = [f"{selected_year}{str(i).zfill(2)}" for i in range(1, selected_month_num + 1)]
-
-cumulative_loan_data = df_loan_amt[df_loan_amt['기준년월'].isin(cumulative_months)].groupby(groups)['취급액'].sum().reset_index()
-cumulative_loan_data['sort_key'] = cumulative_loan_data.apply(custom_sort_key, axis=1)
-cumulative_loan_data = cumulative_loan_data.sort_values('sort_key').drop('sort_key', axis=1)
-
-
-신차_취급액_합 = cumulative_loan_data[cumulative_loan_data['구분1'] == '신차']['취급액'].sum() if '구분1' in cumulative_loan_data.columns else None
-row = ['신차', 'total', 'total', 'total', 신차_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','취급액'])
-cumulative_loan_data = pd.concat([row_df, cumulative_loan_data], ignore_index=True)
-
-중고_취급액_합 = cumulative_loan_data[cumulative_loan_data['구분1'] == '중고']['취급액'].sum() if '구분1' in cumulative_loan_data.columns else None
-row = ['중고', 'total', 'total', 'total', 중고_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','취급액'])
-cumulative_loan_data = pd.concat([cumulative_loan_data[:10],row_df, cumulative_loan_data[10:]], ignore_index=True)
-
-임대_취급액_합 = cumulative_loan_data[cumulative_loan_data['구분2'] == '임대']['취급액'].sum() if '구분2' in cumulative_loan_data.columns else None
-row = ['신차', '임대', 'total', 'total', 임대_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','취급액'])
-cumulative_loan_data = pd.concat([cumulative_loan_data[:4],row_df, cumulative_loan_data[4:]], ignore_index=True)
-
-
-임대신규_취급액_합 = cumulative_loan_data[cumulative_loan_data['구분3'] == '임대신규']['취급액'].sum() if '구분3' in cumulative_loan_data.columns else None
-row = ['신차', '임대', '임대신규', 'total', 임대신규_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','취급액'])
-cumulative_loan_data = pd.concat([cumulative_loan_data[:5],row_df, cumulative_loan_data[5:]], ignore_index=True)
-
-
-임대연장_취급액_합 = cumulative_loan_data[cumulative_loan_data['구분3'] == '임대연장']['취급액'].sum() if '구분3' in cumulative_loan_data.columns else None
-row = ['신차', '임대', '임대연장', 'total', 임대연장_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','취급액'])
-cumulative_loan_data = pd.concat([cumulative_loan_data[:9],row_df, cumulative_loan_data[9:]], ignore_index=True)
-
-#7.24 추가 
-할부_취급액_합 = cumulative_loan_data[cumulative_loan_data['구분2'] == '할부']['취급액'].sum() if '구분2' in cumulative_loan_data.columns else None
-row = ['신차', '할부', 'total', 'total', 할부_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','취급액'])
-cumulative_loan_data = pd.concat([cumulative_loan_data[:1],row_df, cumulative_loan_data[1:]], ignore_index=True)
-
-
-# # 누적 OP 데이터와 병합
-cumulative_op_result= op_loan_amt[op_loan_amt['bas_yrmn'].isin(cumulative_months)].groupby(groups)['value'].sum().reset_index()
-cumulative_op_result['sort_key'] = cumulative_op_result.apply(custom_sort_key, axis=1)
-
-
-cumulative_op_result= cumulative_op_result.sort_values('sort_key').drop('sort_key', axis=1)
-cumulative_op_result.drop(columns=['bas_yrmn', 'product','depart'], inplace=True, errors='ignore')
-
-신차_취급액_합 = cumulative_op_result[cumulative_op_result['구분1'] == '신차']['value'].sum() if '구분1' in cumulative_op_result.columns else None
-row = ['신차', 'total', 'total', 'total', 신차_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','value'])
-cumulative_op_result= pd.concat([row_df, cumulative_op_result], ignore_index=True)
-
-중고_취급액_합 = cumulative_op_result[cumulative_op_result['구분1'] == '중고']['value'].sum() if '구분1' in cumulative_op_result.columns else None
-row = ['중고', 'total', 'total', 'total', 중고_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','value'])
-cumulative_op_result= pd.concat([cumulative_op_result[:10],row_df, cumulative_op_result[10:]], ignore_index=True)
-
-
-임대_취급액_합 = cumulative_op_result[cumulative_op_result['구분2'] == '임대']['value'].sum() if '구분2' in cumulative_op_result.columns else None
-row = ['신차', '임대', 'total', 'total', 임대_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','value'])
-cumulative_op_result= pd.concat([cumulative_op_result[:4],row_df, cumulative_op_result[4:]], ignore_index=True)
-
-
-임대신규_취급액_합 = cumulative_op_result[cumulative_op_result['구분3'] == '임대신규']['value'].sum() if '구분3' in cumulative_op_result.columns else None
-row = ['신차', '임대', '임대신규', 'total', 임대신규_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','value'])
-cumulative_op_result= pd.concat([cumulative_op_result[:5],row_df, cumulative_op_result[5:]], ignore_index=True)
-
-
-임대연장_취급액_합 = cumulative_op_result[cumulative_op_result['구분3'] == '임대연장']['value'].sum() if '구분3' in cumulative_op_result.columns else None
-row = ['신차', '임대', '임대연장', 'total', 임대연장_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','value'])
-cumulative_op_result= pd.concat([cumulative_op_result[:9],row_df, cumulative_op_result[9:]], ignore_index=True)
-cumulative_op_result.drop(columns=['bas_yrmn', 'product','depart'], inplace=True, errors='ignore')
-
-#7.24 추가 
-할부_취급액_합 = cumulative_op_result[cumulative_op_result['구분2'] == '할부']['value'].sum() if '구분2' in cumulative_op_result.columns else None
-row = ['신차', '할부', 'total', 'total', 할부_취급액_합]
-row_df = pd.DataFrame([row], columns=['구분1','구분2','구분3','구분4','value'])
-cumulative_op_result = pd.concat([cumulative_op_result[:1],row_df, cumulative_op_result[1:]], ignore_index=True)
-cumulative_op_result.drop(columns=['bas_yrmn', 'product','depart'], inplace=True, errors='ignore')
-
-
-cumulative_loan_result = pd.merge(cumulative_loan_data, cumulative_op_result, 
-   left_on=['구분1','구분2','구분3','구분4'], right_on=['구분1','구분2','구분3','구분4'], 
-   how='inner').rename(columns={'취급액': '취급액', 'value': 'OP_취급액'}).reset_index(drop=True)
-
-new=['신차','할부','할부 - 신차영업팀','할부 - 플랫폼영업팀','할부 - Auto법인마케팅팀','임대','임대신규','신차영업팀','플랫폼영업팀','Auto법인마케팅팀',
-'임대연장','신차영업팀','플랫폼영업팀','Auto법인마케팅팀','중고','중고론 - 중고영업팀','중고론 - 플랫폼영업팀','중고론 - Auto법인마케팅팀',
-'중고리스 - 중고영업팀','중고리스 - 플랫폼영업팀','중고리스 - Auto법인마케팅팀','재고금융 - 중고영업팀']
-current_loan_result.insert(0,'구분',new)
-prev_loan_result.insert(0,'구분',new)
-cumulative_loan_result.insert(0,'구분',new)
-
-    
-
-def create_product_loan_table_data():
-    table_rows = []
-
-    for idx, row in current_loan_result.iterrows():
-        전월_data = prev_loan_result.iloc[idx]
-        누적_data = cumulative_loan_result.iloc[idx]
-
-        # 당월 데이터
-        당월_실적 = row['취급액'] / 1e8
-        당월_OP = row['OP_취급액']
-        당월_달성률 = (당월_실적 / 당월_OP * 100) if 당월_OP > 0 else 0
-
-        # 전월 데이터
-        if 전월_data is not None:
-            전월_실적 = 전월_data['취급액'] / 1e8
-            전월대비 = 당월_실적 - 전월_실적
-        else:
-            전월대비 = 0
-
-        # 누적 데이터
-        if 누적_data is not None:
-            누적_실적 = 누적_data['취급액'] / 1e8
-            누적_OP = 누적_data['OP_취급액']
-            누적_달성률 = (누적_실적 / 누적_OP * 100) if 누적_OP > 0 else 0
-        else:
-            누적_실적 = 당월_실적
-            누적_OP = 당월_OP
-            누적_달성률 = 당월_달성률
-
-        table_rows.append([
-            row['구분'],
-            f"{당월_OP:,.2f}",
-            f"{당월_실적:,.2f}",
-            f"{당월_달성률:.2f}%",
-            f"{전월대비:+,.2f}",
-            f"{누적_OP:,.2f}",
-            f"{누적_실적:,.2f}",
-            f"{누적_달성률:.2f}%"
-        ])
-
-    return table_rows
-    
-dynamic_month_header = f"당월('{year_short}.{selected_month_num}월)"
-dynamic_cumulative_header = f"누적('{year_short}.1~{selected_month_num}월)"
-table_data = create_product_loan_table_data()    
-df_table_data =pd.DataFrame(table_data,columns=['구분','당월_OP','당월_실적','당월_달성률','전월대비','누적_OP','누적_실적','누적_달성률'])
-
-
-excel_buffer = io.BytesIO()
-df_table_data.to_excel(excel_buffer, index=True)
-excel_buffer.seek(0)
-st.sidebar.download_button(label=f"{selected_year}년_{selected_month_num}월_상품별취급액",
-data=excel_buffer,
-file_name=f"{selected_year}년_{selected_month_num}월_상품별취급액.xlsx",
-mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+with profiler.section('상품별취급액 다운로드 준비'):
+    export_button('상품별취급액', product_result)
 
 
 st.sidebar.markdown("---")
@@ -754,56 +218,30 @@ st.sidebar.markdown("---")
 
 
 
-#=== 모든 셀에 구분별 스타일을 적용하는 커스텀 테이블 함수 ===
-def create_product_loan_custom_table_html_fullstyle(data):
-    html = f"""
-    <div style="overflow-x: auto; margin: 0px; padding: 0px;">
-        <table style="width: 100%; border-collapse: collapse; border: 2px solid #2563eb; border-top: 3px solid #000000; border-bottom: 3px solid #000000; border-radius: 10px; overflow: hidden; box-shadow: 0 6px 15px rgba(0,0,0,0.15); margin: 0px;">
-            <thead>
-                <tr>
-                    <th rowspan="2" style="background: #1e40af; color: white; font-weight: bold; font-size: 20px; text-align: center; vertical-align: middle; padding: 14px 8px; border: 2px solid #ffffff; text-shadow: 1px 1px 3px rgba(0,0,0,0.4);">구분</th>
-                    <th colspan="4" style="background: #1e40af; color: white; font-weight: bold; font-size: 20px; text-align: center; vertical-align: middle; padding: 14px 8px; border: 2px solid #ffffff; text-shadow: 1px 1px 3px rgba(0,0,0,0.4);">{dynamic_month_header}</th>
-                    <th colspan="3" style="background: #1e40af; color: white; font-weight: bold; font-size: 20px; text-align: center; vertical-align: middle; padding: 14px 8px; border: 2px solid #ffffff; text-shadow: 1px 1px 3px rgba(0,0,0,0.4);">{dynamic_cumulative_header}</th>
-                </tr>
-                <tr>
-                    <th style="background: #2563eb; color: white; font-weight: bold; font-size: 20x; text-align: center; vertical-align: middle; padding: 10px 6px; border: 1px solid #ffffff;">OP</th>
-                    <th style="background: #2563eb; color: white; font-weight: bold; font-size: 20px; text-align: center; vertical-align: middle; padding: 10px 6px; border: 1px solid #ffffff;">실적</th>
-                    <th style="background: #2563eb; color: white; font-weight: bold; font-size: 20px; text-align: center; vertical-align: middle; padding: 10px 6px; border: 1px solid #ffffff;">달성률</th>
-                    <th style="background: #2563eb; color: white; font-weight: bold; font-size: 20px; text-align: center; vertical-align: middle; padding: 10px 6px; border: 1px solid #ffffff;">전월대비</th>
-                    <th style="background: #2563eb; color: white; font-weight: bold; font-size: 20px; text-align: center; vertical-align: middle; padding: 10px 6px; border: 1px solid #ffffff;">OP</th>
-                    <th style="background: #2563eb; color: white; font-weight: bold; font-size: 20px; text-align: center; vertical-align: middle; padding: 10px 6px; border: 1px solid #ffffff;">실적</th>
-                    <th style="background: #2563eb; color: white; font-weight: bold; font-size: 20px; text-align: center; vertical-align: middle; padding: 10px 6px; border: 1px solid #ffffff;">달성률</th>
-                </tr>
-            </thead>
-            <tbody>
-    """
-    for i, row in enumerate(data):
-        구분 = row[0]
-        # subtotal 스타일 지정
-        if 구분 in ['신차', '중고']:  
-            cell_style = "background-color: #bfdbfe; color: #1e40af; font-weight: bold; text-align: center;"
-        elif 구분 in ['할부', '임대']:
-            cell_style = "background-color: #e0f2fe; color: #60a5fa; font-weight: bold; text-align: center;"
-        elif 구분 in ['임대신규', '임대연장']:
-            cell_style = "background-color: #f0f9ff; color: black; font-weight: bold; text-align: center;"
-        else:
-            cell_style = "background-color: white; color: black; font-weight: normal; text-align: center;"
-        html += f'<tr>'
+# # # === 표 렌더링 예시 ===
+with profiler.section('상품별 취급액 HTML'):
+    custom_product_table_html_fullstyle = cached_table_html('상품별취급액', selected_month, month_version, scenario, lambda: create_product_loan_custom_table_html_fullstyle(product_result))
+st.markdown(custom_product_table_html_fullstyle, unsafe_allow_html=True)
 
-        for j in range(len(row)):
-            html += f'<td style="{cell_style} vertical-align: middle; padding: 8px; border: 1px solid #dbeafe; font-size: 20px;">{row[j]}</td>'
-        
 
-        html += '</tr>'
-    html += """
-            </tbody>
-        </table>
-    </div>
-    """
-    return html
+# === 월별 추이 (전체 기준년월, 토글을 켰을 때만 렌더 - 차트는 데이터 버전별로 캐시) ===
+st.markdown('<h2 style="font-size: 25px; margin-bottom: 0px; padding-bottom: 0px;">● 월별 추이</h2>', unsafe_allow_html=True)
+if st.toggle("전체 기준년월 실적/OP 추이 보기"):
+    with profiler.section('월별 추이'):
+        trend, trend_png = cached_trend(data_version, kpi_cube, months)
+    st.image(trend_png, width='stretch')
+    st.dataframe(trend.set_axis([f'{label} {measure}' for label, measure in trend.columns], axis=1).round(1))
 
-# # # === 표 렌더링 예시 ===
-custom_product_table_html_fullstyle = create_product_loan_custom_table_html_fullstyle(table_data)
-st.markdown(custom_product_table_html_fullstyle, unsafe_allow_html=True)
 
+# === 부서별 상세 (구분 선택 시에만 해당 월 parquet slice 로드) ===
+with st.expander("부서별 일자별 상세"):
+    detail_name = st.selectbox("상세 조회 구분", list(dept_detail_sources), index=None, placeholder="구분 선택")
+    if detail_name is not None:
+        with profiler.section('부서별 상세'):
+            st.dataframe(load_dept_detail(detail_name, selected_month, json.dumps(source_fingerprint(dept_detail_sources[detail_name][0]))), hide_index=True)
 
+# === 성능 측정 패널 / 로그 ===
+if profiler.enabled:
+    with st.sidebar.expander("성능 측정 (이번 rerun)", expanded=True):
+        st.dataframe(profiler.frame(), hide_index=True)
+    profiler.append_log(os.environ.get('DASHBOARD_PROFILE_LOG', 'profile.jsonl'), month=selected_month, data_version=data_version)
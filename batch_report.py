@@ -0,0 +1,84 @@
+"""여러 기준년월의 취급지표 / 상품별취급액 표를 한 번에 만드는 배치 리포트
+
+    python batch_report.py [--months 202501 202502 ...] [--format xlsx|parquet] [--output report] [--workers 4]
+
+--months 를 생략하면 실적이 있는 모든 월을 만든다. 표 계산은 대시보드와 같은 engine 함수를 쓰므로
+숫자가 화면과 일치한다. 월 단위로 process pool 에 나눠 계산하고, 각 worker 는 집계를 한 번만 로드한다.
+
+- xlsx: <output>.xlsx 한 파일에 월별 '<YYYYMM>_취급지표', '<YYYYMM>_상품별취급액' 시트
+- parquet: <output>/취급지표.parquet, <output>/상품별취급액.parquet (기준년월 컬럼으로 월 구분).
+  화면용 문자열이 아닌 숫자 값 표(values_frame)를 쓴다
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import pandas as pd
+
+from engine import compute_kpi_table, compute_product_table
+from store import load_bundle
+
+# worker 프로세스별 집계 (initializer 에서 한 번 로드)
+bundle = None
+
+
+def init_worker():
+    global bundle
+    bundle = load_bundle()
+
+
+def month_tables(month, values=False):
+    """한 달의 (취급지표, 상품별취급액) 표 - 대시보드와 같은 계산. values 면 숫자 값 표, 아니면 화면과 같은 문자열 표"""
+    months, kpi_cube, loan_fact_by_month, quality_report, data_version, month_versions = bundle
+    tables = compute_kpi_table(kpi_cube, month), compute_product_table(kpi_cube, loan_fact_by_month, month)
+    return (month, *(table.values_frame() if values else table.to_frame() for table in tables))
+
+
+def write_xlsx(results, path):
+    with pd.ExcelWriter(path) as writer:
+        for month, df_display, df_table_data in results:
+            df_display.to_excel(writer, sheet_name=f'{month}_취급지표', index=True)
+            df_table_data.to_excel(writer, sheet_name=f'{month}_상품별취급액', index=True)
+
+
+def write_parquet(results, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    kpi = pd.concat([kpi_values.assign(기준년월=month) for month, kpi_values, _ in results], ignore_index=True)
+    product = pd.concat([product_values.assign(기준년월=month) for month, _, product_values in results], ignore_index=True)
+    kpi.to_parquet(os.path.join(output_dir, '취급지표.parquet'), index=False)
+    product.to_parquet(os.path.join(output_dir, '상품별취급액.parquet'), index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="월별 취급지표/상품별취급액 배치 리포트")
+    parser.add_argument('--months', nargs='*', help="YYYYMM 목록 (생략 시 전체 월)")
+    parser.add_argument('--format', choices=['xlsx', 'parquet'], default='xlsx')
+    parser.add_argument('--output', default='report')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    # 부모에서 먼저 로드해 loan_fact 캐시를 만들어 두면 worker 는 캐시만 읽는다
+    months, _, _, quality_report, _, _ = load_bundle()
+    targets = sorted(args.months or months)
+    unknown = sorted(set(targets) - set(months))
+    if unknown:
+        parser.error(f"실적이 없는 기준년월: {', '.join(unknown)}")
+
+    if not quality_report.empty:
+        print(f"데이터 점검 {len(quality_report)}건:\n{quality_report.to_string(index=False)}")
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker) as pool:
+        results = list(pool.map(partial(month_tables, values=args.format == 'parquet'), targets))
+
+    if args.format == 'xlsx':
+        path = args.output if args.output.endswith('.xlsx') else args.output + '.xlsx'
+        write_xlsx(results, path)
+    else:
+        path = args.output
+        write_parquet(results, path)
+    print(f"{len(results)} months -> {path}")
+
+
+if __name__ == '__main__':
+    main()
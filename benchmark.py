@@ -0,0 +1,212 @@
+"""합성 데이터로 대시보드 단계별 성능 측정
+
+    python benchmark.py [--scales 1 10 100] [--sample-months 12] [--output benchmark.json] [--compare 이전결과.json]
+
+실제 요약 parquet(df_handover / df_loan_amt / op_handover / op_loan_amt)과 같은 컬럼/키 구성의 합성 데이터를
+배율별 임시 디렉터리에 만들고, 대시보드와 같은 engine/render 함수로 아래 단계를 따로 잰다.
+
+- load_cold / load_warm: load_bundle() (원본에서 집계해 공유 저장소 생성 / 저장소가 있을 때 새 프로세스처럼 열기만)
+- compute: 월별 compute_kpi_table / compute_product_table
+- scenario: 모든 (상품, 부서) OP 를 110% 로 조정한 취급지표 + ProductTable.with_scenario (계산된 표에서 재계산만)
+- render: 표 HTML 생성
+- export: 표 xlsx 변환
+
+배율 N 은 이력 개월 수와 부서 수를 각각 N 배로 늘린다. 취급액 키는 상품 계층의 상품(engine.product_groups) x 부서이고,
+부서는 engine.departments 에 N 배까지 합성 부서('신차영업팀2' ...)를 붙인 목록이다. 측정 중에는 엔진 상품 계층의 부서 목록도
+같은 목록으로 바꿔 합성 부서가 정의된 부서로 정렬/점검된다. 결과는 JSON 으로 저장하고, --compare 로 이전 결과와 비율을 출력한다.
+"""
+import argparse
+import json
+from contextlib import contextmanager
+import os
+import platform
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import engine
+import render
+import store
+
+# 실제 데이터 기준 (8개월 실적, OP 는 실적 마지막 월 이후 5개월까지)
+base_months = 8
+op_extra_months = 5
+last_actual_month = '202507'
+
+handover_products = engine.handover_products
+
+
+def scaled_departments(scale):
+    """engine.departments 뒤에 합성 부서를 붙여 scale 배로 늘린 목록"""
+    return [*engine.departments, *(f'{department}{copy}' for copy in range(2, scale + 1) for department in engine.departments)]
+
+
+def loan_keys(departments):
+    """(상품구분, 상품구분_세부, 부서) - 실적 취급액 키 (상품 계층의 상품 x 부서)"""
+    return [(actual_key[0], actual_key[1], department)
+            for group in engine.product_groups.values() for actual_key in group.actual_keys for department in departments]
+
+
+@contextmanager
+def engine_departments(departments):
+    """측정 동안 엔진 상품 계층의 부서 목록을 departments 로 바꾼다 (engine.set_hierarchy 로 계층 파생 표를 모두 다시 만든다)"""
+    original = engine.product_groups, engine.departments
+    engine.set_hierarchy(engine.product_groups, departments)
+    try:
+        yield
+    finally:
+        engine.set_hierarchy(*original)
+
+
+def month_range(end, count):
+    """end 로 끝나는 count 개월 YYYYMM 목록"""
+    return [period.strftime('%Y%m') for period in pd.period_range(end=pd.Period(end, 'M'), periods=count, freq='M')]
+
+
+def expand(keys, months):
+    """(월 x 키) 롱 프레임의 키 컬럼과 행 수"""
+    grid = pd.MultiIndex.from_product([months, range(len(keys))]).to_frame(index=False)
+    key_values = np.array(keys, dtype=object)[grid[1].to_numpy()]
+    return grid[0].to_numpy(), key_values, len(grid)
+
+
+def write_synthetic(directory, scale, departments, seed=0):
+    """배율 scale (이력 개월 수) / departments (부서) 의 합성 요약 parquet 4종을 directory 에 쓰고 파일별 행 수를 반환"""
+    rng = np.random.default_rng(seed)
+    actual_months = month_range(last_actual_month, base_months * scale)
+    op_months = month_range(pd.Period(last_actual_month, 'M') + op_extra_months, base_months * scale + op_extra_months)
+    actual_keys = loan_keys(departments)
+    # 부서가 늘어도 상품 합계 규모는 비슷하도록 키당 금액을 나눈다
+    per_department = len(engine.departments) / len(departments)
+
+    month, key, n = expand([(product,) for product in handover_products], actual_months)
+    denominator = rng.integers(20_000, 80_000, n)
+    df_handover = pd.DataFrame({'기준년월': month, '상품구분': key[:, 0],
+                                '인수율분모': denominator, '인수율분자값': (denominator * rng.uniform(0.05, 0.3, n)).astype('int64')})
+
+    month, key, n = expand(actual_keys, actual_months)
+    df_loan_amt = pd.DataFrame({'기준년월': month, '상품구분': key[:, 0], '상품구분_세부': key[:, 1], '부서': key[:, 2],
+                                '취급액': rng.uniform(1e9, 5e11, n) * per_department})
+
+    month, key, n = expand([(product,) for product in handover_products], op_months)
+    denominator = rng.uniform(20_000, 90_000, n)
+    op_handover = pd.DataFrame({'bas_yrmn': month, 'product': key[:, 0],
+                                'denominator': denominator, 'numerator': denominator * rng.uniform(0.05, 0.35, n)})
+
+    # (product, depart) - OP 취급액 키 (실적의 상품구분_세부, 부서와 같은 값)
+    month, key, n = expand([(detail, department) for _, detail, department in actual_keys], op_months)
+    op_loan_amt = pd.DataFrame({'bas_yrmn': month, 'product': key[:, 0], 'depart': key[:, 1],
+                                'value': rng.uniform(10, 5_000, n) * per_department})
+
+    frames = {'df_handover': df_handover, 'df_loan_amt': df_loan_amt, 'op_handover': op_handover, 'op_loan_amt': op_loan_amt}
+    for name, frame in frames.items():
+        frame.astype({column: 'string' for column in frame.columns if frame[column].dtype == object}) \
+             .to_parquet(os.path.join(directory, engine.source_files[name][0]), index=False)
+    return {name: len(frame) for name, frame in frames.items()}
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def summarize(samples):
+    return {'mean_ms': round(statistics.mean(samples), 3), 'max_ms': round(max(samples), 3)}
+
+
+def run_scale(scale, sample_months):
+    """임시 디렉터리에 합성 데이터를 만들고 engine 이 그 디렉터리를 읽도록 해서 단계별 측정"""
+    cwd = os.getcwd()
+    departments = scaled_departments(scale)
+    with tempfile.TemporaryDirectory(prefix=f'bench{scale}x_') as directory, engine_departments(departments):
+        rows = write_synthetic(directory, scale, departments)
+        os.chdir(directory)
+        engine.part_cache.clear()
+        try:
+            _, load_cold = timed(store.load_bundle)
+            # 새 서버 프로세스처럼 원본 part 집계 없이 저장소만 연다
+            engine.part_cache.clear()
+            bundle, load_warm = timed(store.load_bundle)
+            months, kpi_cube, loan_fact_by_month, quality_report, data_version, month_versions = bundle
+
+            scenario = tuple((key, 1.1) for key in engine.scenario_keys(kpi_cube))
+            samples = {key: [] for key in ['compute_kpi', 'compute_product', 'scenario', 'render_kpi', 'render_product',
+                                           'export_kpi', 'export_product']}
+            for month in months[:sample_months]:
+                kpi_result, elapsed = timed(engine.compute_kpi_table, kpi_cube, month)
+                samples['compute_kpi'].append(elapsed)
+                product_result, elapsed = timed(engine.compute_product_table, kpi_cube, loan_fact_by_month, month)
+                samples['compute_product'].append(elapsed)
+                start = time.perf_counter()
+                engine.compute_kpi_table(kpi_cube, month, scenario)
+                product_result.with_scenario(scenario)
+                samples['scenario'].append((time.perf_counter() - start) * 1000)
+                samples['render_kpi'].append(timed(render.create_custom_table_html, kpi_result)[1])
+                samples['render_product'].append(timed(render.create_product_loan_custom_table_html_fullstyle, product_result)[1])
+                samples['export_kpi'].append(timed(render.frame_to_bytes, kpi_result.to_frame(), 'xlsx')[1])
+                samples['export_product'].append(timed(render.frame_to_bytes, product_result.to_frame(), 'xlsx')[1])
+        finally:
+            os.chdir(cwd)
+
+    return {
+        'rows': rows,
+        'months': len(months),
+        'departments': len(departments),
+        'sampled_months': min(sample_months, len(months)),
+        'load_cold_ms': round(load_cold, 3),
+        'load_warm_ms': round(load_warm, 3),
+        **{key: summarize(values) for key, values in samples.items()},
+    }
+
+
+def compare(current, previous):
+    """이전 결과 대비 비율 (현재 / 이전, 1 보다 크면 느려짐)"""
+    for scale, result in current['scales'].items():
+        before = previous.get('scales', {}).get(scale)
+        if before is None:
+            continue
+        print(f"[{scale}x]")
+        for key, value in result.items():
+            if key.endswith('_ms'):
+                now, then = value, before.get(key)
+            elif isinstance(value, dict) and 'mean_ms' in value:
+                now, then = value['mean_ms'], before.get(key, {}).get('mean_ms')
+            else:
+                continue
+            if then:
+                print(f"  {key:<16} {then:>10.2f} -> {now:>10.2f} ms  x{now / then:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="합성 데이터 대시보드 벤치마크")
+    parser.add_argument('--scales', nargs='*', type=int, default=[1, 10, 100])
+    parser.add_argument('--sample-months', type=int, default=12, help="배율별 compute/render/export 측정 월 수 (최근 월부터)")
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--compare', help="비교할 이전 결과 JSON")
+    args = parser.parse_args()
+
+    results = {
+        'environment': {'python': platform.python_version(), 'pandas': pd.__version__, 'excel_engine': render.excel_engine},
+        'scales': {},
+    }
+    for scale in args.scales:
+        results['scales'][str(scale)] = run_scale(scale, args.sample_months)
+        result = results['scales'][str(scale)]
+        print(f"{scale}x: months={result['months']} departments={result['departments']} load={result['load_cold_ms']:.0f}/{result['load_warm_ms']:.0f}ms "
+              f"product={result['compute_product']['mean_ms']:.1f}ms scenario={result['scenario']['mean_ms']:.1f}ms export={result['export_product']['mean_ms']:.1f}ms")
+
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(results, file, ensure_ascii=False, indent=2)
+    print(f"-> {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            compare(results, json.load(file))
+
+
+if __name__ == '__main__':
+    main()
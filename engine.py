@@ -0,0 +1,873 @@
+"""대시보드 집계 엔진 (Streamlit 비의존)
+
+app_temp.py 페이지와 batch_report.py 배치가 같은 함수로 당월/전월/누적 표를 만들도록
+원본 로드, 사전 집계, 표 계산을 모아 둔 모듈. 원본 part 집계는 프로세스 메모리(part_cache)에,
+월별 표는 MonthTableStore 에 두고, 프로세스 간 공유 저장소(디스크)는 store.py, 화면 출력/세션 캐시는 app_temp.py 에서 담당한다.
+"""
+import bisect
+import glob
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# 원본 parquet: (파일, 월 컬럼, 대시보드가 읽는 컬럼, category 로 둘 저카디널리티 텍스트 컬럼)
+source_files = {
+    'df_handover': ('df_handover_summary_monthly.parquet', '기준년월',
+                    ['기준년월', '상품구분', '인수율분모', '인수율분자값'], ['기준년월', '상품구분']),
+    'df_loan_amt': ('df_loan_amt_summary_monthly.parquet', '기준년월',
+                    ['기준년월', '상품구분', '상품구분_세부', '부서', '취급액'], ['기준년월', '상품구분', '상품구분_세부', '부서']),
+    'op_handover': ('op_car_handover.parquet', 'bas_yrmn',
+                    ['bas_yrmn', 'product', 'denominator', 'numerator'], ['bas_yrmn', 'product']),
+    'op_loan_amt': ('op_car_loan_amt.parquet', 'bas_yrmn',
+                    ['bas_yrmn', 'product', 'depart', 'value'], ['bas_yrmn', 'product', 'depart']),
+}
+
+# partition_sources.py 로 만든 월 파티션 데이터셋 위치
+partitioned_root = 'partitioned'
+
+def dataset_path(path):
+    """월 파티션 데이터셋이 있으면 그 디렉터리, 없으면 원본 파일"""
+    partitioned = os.path.join(partitioned_root, os.path.splitext(os.path.basename(path))[0])
+    return partitioned if os.path.isdir(partitioned) else path
+
+def stale_flat_files(paths):
+    """paths 중 월 파티션 데이터셋이 있는데 그보다 늦게 수정된 평면 원본 파일.
+    대시보드는 데이터셋만 읽으므로 partition_sources.py 를 다시 돌리기 전까지 반영되지 않는다"""
+    stale = []
+    for path in paths:
+        dataset = dataset_path(path)
+        if dataset != path and os.path.exists(path):
+            latest = max((os.stat(file).st_mtime_ns for file in glob.glob(os.path.join(dataset, '*', '*.parquet'))), default=0)
+            if os.stat(path).st_mtime_ns > latest:
+                stale.append(path)
+    return stale
+
+def read_months(path, month_column, columns, months=None):
+    """months 가 주어지면 해당 월만 읽는다.
+    파티션 데이터셋은 디렉터리 단위로, 원본 파일은 row group 통계로 걸러진다."""
+    filters = [(month_column, 'in', list(months))] if months is not None else None
+    partitioning = ds.partitioning(pa.schema([(month_column, pa.string())]), flavor='hive')
+    return pd.read_parquet(dataset_path(path), columns=columns, filters=filters,
+                           partitioning=partitioning, dtype_backend='pyarrow')
+
+def read_source(path, month_column, columns, category_columns, months=None):
+    """필요한 컬럼만 pyarrow dtype backend 로 읽고 텍스트 컬럼은 dictionary 인코딩(category)으로 보관"""
+    frame = read_months(path, month_column, columns, months)
+    return frame.astype({column: 'category' for column in category_columns})
+
+# 부서별 상세 parquet (요약 파일에 합산된 원천 데이터, 조회 시에만 해당 월만 읽음)
+# 구분 -> (파일, 일자 컬럼, 대상여부 컬럼, 합계 컬럼, 단위 환산 나눗수, 단위)
+dept_detail_sources = {
+    '할부 - 신차영업팀': ('df_halbu_newcar_dept.parquet', '기준일자', '할부취급액대상여부', '총대출금액', 1e8, '억원'),
+    '임대신규 - 신차영업팀': ('df_lease_newcar_dept.parquet', '기준일자', '임대신규취급액대상여부', '취득원가', 1e8, '억원'),
+    '임대연장 - 신차영업팀': ('df_lease_long_newcar_dept.parquet', '기준일자', '임대연장취급액대상여부', '취득원가', 1, '억원'),
+    '신차출고 - 신차영업팀': ('df_chulgo_newcar_dept.parquet', '기준년월일', '인수율분모여부', '총출고건수_당사취급', 1, '건'),
+    '할부 - Auto법인마케팅팀': ('df_loan_amt_firm_dept.parquet', '기준일자', '할부취급액대상여부', '취급금액', 1, '억원'),
+    '임대신규 - Auto법인마케팅팀': ('df_loan_amt_firm_dept.parquet', '기준일자', '임대신규취급액대상여부', '취급금액', 1, '억원'),
+    '임대연장 - Auto법인마케팅팀': ('df_loan_amt_firm_dept.parquet', '기준일자', '임대연장취급액대상여부', '취급금액', 1, '억원'),
+    '중고론 - Auto법인마케팅팀': ('df_loan_amt_firm_dept.parquet', '기준일자', '중고론취급액대상여부', '취급금액', 1, '억원'),
+    '중고리스 - Auto법인마케팅팀': ('df_loan_amt_firm_dept.parquet', '기준일자', '중고리스취급액대상여부', '취급금액', 1, '억원'),
+    '임대신규 - 플랫폼영업팀': ('df_loan_amt_lease_platform_dept.parquet', '기준일자', '임대신규취급액대상여부', '취급액', 1e8, '억원'),
+    '중고리스 - 플랫폼영업팀': ('df_loan_amt_lease_platform_dept.parquet', '기준일자', '중고리스취급액대상여부', '취급액', 1e8, '억원'),
+    '중고론 - 중고영업팀': ('df_loan_amt_used_dept.parquet', '기준일자', '중고론취급액대상여부', '대출금액', 1e8, '억원'),
+    '중고리스 - 중고영업팀': ('df_loan_amt_used_dept.parquet', '기준일자', '중고리스취급액대상여부', '대출금액', 1e8, '억원'),
+    '재고금융 - 중고영업팀': ('df_loan_amt_used_dept.parquet', '기준일자', '재고금융취급액대상여부', '대출금액', 1e8, '억원'),
+}
+
+def read_dept_detail(path, date_column, flag_column, value_column, divisor, unit, month):
+    """month 파티션(또는 row group)만 읽어 일자별 합계"""
+    frame = read_months(path, '기준년월', [date_column, flag_column, value_column], [month])
+    target = frame[frame[flag_column] == 1]
+    return (target.groupby(date_column)[value_column].agg(['size', 'sum'])
+            .set_axis(['건수', f'합계({unit})'], axis=1)
+            .assign(**{f'합계({unit})': lambda detail: detail[f'합계({unit})'] / divisor})
+            .rename_axis('일자')
+            .reset_index())
+
+# === 상품 계층 (상품별 취급액 표의 구분1~구분4) ===
+groups = ['구분1', '구분2', '구분3', '구분4']
+
+@dataclass(frozen=True)
+class ProductGroup:
+    """구분2 상품군. products 는 실적 상품구분_세부 / OP product 값, category 는 실적 상품구분 값 (없으면 division).
+    subtotal 이면 상품군 소계 행을 두고, split_by_product 면 구분3 이 상품(상품별 소계 아래 부서 행), 아니면 구분3 이 부서"""
+    division: str
+    products: tuple
+    subtotal: bool = False
+    split_by_product: bool = False
+    category: str = None
+
+    @property
+    def actual_keys(self):
+        """실적 취급액 cube 키 (상품구분, 상품구분_세부) 목록"""
+        return [(self.category or self.division, product) for product in self.products]
+
+# 표 순서대로 정의 - 상품/부서 추가 시 여기만 수정 (정의에 없는 값은 데이터 점검에 보고되고 표 맨 뒤로)
+product_groups = {
+    '할부': ProductGroup('신차', ('할부', '할부연장'), subtotal=True, category='할부'),
+    '임대': ProductGroup('신차', ('임대신규', '임대연장'), subtotal=True, split_by_product=True, category='임대'),
+    '중고론': ProductGroup('중고', ('중고론',)),
+    '중고리스': ProductGroup('중고', ('중고리스',)),
+    '재고금융': ProductGroup('중고', ('재고금융',)),
+}
+departments = ['신차영업팀', '중고영업팀', '플랫폼영업팀', 'Auto법인마케팅팀']
+
+def compile_hierarchy(product_groups, departments):
+    """계층 정의 -> (상품 Index, 상품 위치별 구분1~구분3 lookup 배열, 구분별 정렬 순서, 구분별 정렬 순위, 소계 레벨,
+    상품별로 나누는 상품군, 버전). lookup 배열 마지막 칸(None)은 정의에 없는 상품 (get_indexer 의 -1)"""
+    nodes = [(group.division, name, product if group.split_by_product else None)
+             for name, group in product_groups.items() for product in group.products]
+    products = pd.Index([product for group in product_groups.values() for product in group.products])
+    lookup = {column: np.array([*values, None], dtype=object) for column, values in zip(groups[:3], zip(*nodes))}
+    group_order = {
+        '구분1': list(dict.fromkeys(group.division for group in product_groups.values())),
+        '구분2': list(product_groups),
+        '구분3': [product for group in product_groups.values() if group.split_by_product for product in group.products],
+        '구분4': list(departments),
+    }
+    # 소계 레벨: (컬럼, 소계를 붙일 값) - None 이면 해당 레벨 전체. 상품별로 나누는 상품군은 상품마다 소계
+    subtotal_levels = [
+        ('구분1', None),
+        ('구분2', [name for name, group in product_groups.items() if group.subtotal]),
+        ('구분3', group_order['구분3']),
+    ]
+    group_rank = {column: {value: rank for rank, value in enumerate(order)} for column, order in group_order.items()}
+    split_groups = [name for name, group in product_groups.items() if group.split_by_product]
+    version = hashlib.sha1(json.dumps([[[name, *vars(group).values()] for name, group in product_groups.items()], departments]).encode()).hexdigest()[:12]
+    return products, lookup, group_order, group_rank, subtotal_levels, split_groups, version
+
+(hierarchy_products, hierarchy_lookup, group_order, group_rank, subtotal_levels, split_groups,
+ hierarchy_version) = compile_hierarchy(product_groups, departments)
+
+def set_hierarchy(new_product_groups, new_departments):
+    """상품 계층을 바꾸고, 계층에서 만든 모듈 전역(정렬 순위/소계 레벨/버전, KPI 구성 상품, 데이터 점검 허용 값)을 모두 다시 만든다.
+    메모리의 part 집계는 이전 계층으로 구분을 붙였으므로 비운다 (공유 저장소는 계층 버전이 경로에 들어가 따로 쓴다).
+    호출한 뒤 bundle 을 다시 만들어야 하며, from engine import 로 가져간 이름은 바뀌지 않는다"""
+    global product_groups, departments, hierarchy_products, hierarchy_lookup, group_order, group_rank, subtotal_levels
+    global split_groups, hierarchy_version, loan_products, kpi_sections, dimension_domains
+    product_groups, departments = dict(new_product_groups), list(new_departments)
+    (hierarchy_products, hierarchy_lookup, group_order, group_rank, subtotal_levels, split_groups,
+     hierarchy_version) = compile_hierarchy(product_groups, departments)
+    loan_products, kpi_sections = compile_kpi_sections(product_groups)
+    dimension_domains = compile_dimension_domains(loan_products, hierarchy_products, departments)
+    part_cache.clear()
+
+def map_hierarchy(product, department):
+    """상품/부서 컬럼 -> 구분1~구분4. 상품 위치 code 로 lookup 배열을 한 번씩 indexing 한다.
+    정의에 없는 상품은 구분1 '기타', 구분2 상품명 그대로"""
+    index, codes = product.index, hierarchy_products.get_indexer(product)
+    mapped = {column: lookup[codes] for column, lookup in hierarchy_lookup.items()}
+    product, department = product.astype(str).to_numpy(), department.astype(str).to_numpy()
+    return pd.DataFrame({
+        '구분1': np.where(pd.isna(mapped['구분1']), '기타', mapped['구분1']),
+        '구분2': np.where(pd.isna(mapped['구분2']), product, mapped['구분2']),
+        '구분3': np.where(pd.isna(mapped['구분3']), department, mapped['구분3']),
+        '구분4': department,
+    }, index=index)
+
+# 월별 집계 / 누적(YTD) prefix sum 인덱스
+# 월 키는 YYYYMM 만 쓴다 - '24', '2025' 같은 연 합계 행은 표/누적/월 선택에서 빼고 데이터 점검에만 보고
+month_pattern = r'\d{6}'
+
+def is_month(value):
+    return re.fullmatch(month_pattern, str(value)) is not None
+
+def column_positions(columns):
+    """컬럼 키 prefix -> 컬럼 위치 목록 (('할부',) 는 ('할부', *) 전체)"""
+    positions = {}
+    for i, column in enumerate(columns):
+        for depth in range(1, len(column) + 1):
+            positions.setdefault(column[:depth], []).append(i)
+    return positions
+
+def build_ytd_index(grouped):
+    """기준년월이 첫 레벨인 집계 결과를 월 순서 누적합 배열로 변환.
+    누적 값은 prefix[당월] - prefix[전년 12월] 한 번의 차이로 계산한다.
+    월별 값(values)도 함께 두어 월별 추이는 같은 pivot 에서 바로 꺼낸다.
+    YYYYMM 이 아닌 월 키('24', '2025' 같은 연 합계 행)는 문자열 순서로 누적 구간에 섞이므로 제외한다 (데이터 점검에 보고)."""
+    wide = grouped.unstack(level=list(range(1, grouped.index.nlevels)), fill_value=0)
+    wide = wide[wide.index.astype(str).str.fullmatch(month_pattern)].sort_index()
+    values = wide.to_numpy(dtype=float)
+    columns = [column if isinstance(column, tuple) else (column,) for column in wide.columns]
+    return {
+        'months': wide.index.to_list(),
+        'columns': columns,
+        'names': list(wide.columns.names),
+        'positions': column_positions(columns),
+        'values': values,
+        # 0행은 첫 달 이전 (합계 0)
+        'prefix': np.vstack([np.zeros(len(columns)), values.cumsum(axis=0)]),
+    }
+
+def ytd_row(index, month):
+    """month 가 속한 연도 1월 ~ month 누적합 (전체 컬럼)"""
+    end = bisect.bisect_right(index['months'], month)
+    start = bisect.bisect_right(index['months'], str(int(month[:4]) - 1) + '12')
+    return index['prefix'][end] - index['prefix'][start]
+
+def month_row(index, month):
+    """month 한 달의 전체 컬럼 값 (해당 월이 없으면 None)"""
+    row = bisect.bisect_left(index['months'], month)
+    if row == len(index['months']) or index['months'][row] != month:
+        return None
+    return index['values'][row]
+
+def month_sum(index, month, *keys):
+    """month 한 달의 keys 컬럼 합 (해당 월이 없으면 0)"""
+    values = month_row(index, month)
+    if values is None:
+        return 0
+    return sum(values[index['positions'][key]].sum() for key in keys if key in index['positions'])
+
+def month_rate(index, month, *products):
+    """월 인수율(%) = 분자 합 / 분모 합 * 100, 분모가 없으면 0"""
+    numerator = month_sum(index, month, *[('numerator', product) for product in products])
+    denominator = month_sum(index, month, *[('denominator', product) for product in products])
+    return (numerator / denominator * 100) if denominator > 0 else 0
+
+def ytd_sum(index, month, *keys):
+    row = ytd_row(index, month)
+    return sum(row[index['positions'][key]].sum() for key in keys if key in index['positions'])
+
+def ytd_rate(index, month, *products):
+    """누적 인수율(%) = 누적 분자 / 누적 분모 * 100"""
+    numerator = ytd_sum(index, month, *[('numerator', product) for product in products])
+    denominator = ytd_sum(index, month, *[('denominator', product) for product in products])
+    return (numerator / denominator * 100) if denominator > 0 else 0
+
+def ytd_frame(index, month):
+    """구분 레벨별 누적합을 지표(첫 컬럼 레벨)별 열로 펼쳐 groupby(...).sum().reset_index() 형태로 반환"""
+    row = pd.Series(ytd_row(index, month), index=pd.MultiIndex.from_tuples(index['columns'], names=index['names']))
+    return row.unstack(level=0).rename_axis(columns=None).reset_index()
+
+# 실적/OP 통합 취급액 fact 테이블
+loan_fact_cache_path = 'loan_fact.cache.parquet'
+
+def source_fingerprint(*paths):
+    """원본 파일 (수정시각, 크기) - 캐시 무효화 기준, 파티션 데이터셋이면 하위 파일 전체.
+    데이터셋이 있어도 평면 파일을 함께 넣어, 평면 파일을 덮어쓰면 데이터 버전이 바뀌고 데이터 점검에 보고되게 한다"""
+    fingerprint = {}
+    for source in paths:
+        path = dataset_path(source)
+        files = sorted(glob.glob(os.path.join(path, '*', '*.parquet'))) if os.path.isdir(path) else [path]
+        if path != source and os.path.exists(source):
+            files.append(source)
+        fingerprint.update({file: [stat.st_mtime_ns, stat.st_size] for file, stat in zip(files, map(os.stat, files))})
+    return fingerprint
+
+def actual_loan_series(df_loan_amt):
+    """실적 취급액(원) -> (기준년월, 구분1~구분4) 별 억원"""
+    return (pd.concat([df_loan_amt[['기준년월', '취급액']], map_hierarchy(df_loan_amt['상품구분_세부'], df_loan_amt['부서'])], axis=1)
+            .groupby(['기준년월', *groups], observed=True)['취급액'].sum() / 1e8).rename('actual_eok')
+
+def op_loan_series(op_loan_amt):
+    """OP 취급액(억원) -> (기준년월, 구분1~구분4) 별 합계"""
+    return (pd.concat([op_loan_amt[['bas_yrmn', 'value']], map_hierarchy(op_loan_amt['product'], op_loan_amt['depart'])], axis=1)
+            .rename(columns={'bas_yrmn': '기준년월'})
+            .groupby(['기준년월', *groups], observed=True)['value'].sum()).rename('op_eok')
+
+def join_loan_fact(actual, op):
+    """실적과 OP 를 (기준년월, 구분1~구분4, actual_eok, op_eok) 롱 테이블로 통합.
+    outer join 이므로 한쪽에만 있는 키는 NaN 으로 남는다."""
+    return (pd.concat([actual, op], axis=1, join='outer')
+            .sort_index()
+            .reset_index())
+
+def load_loan_fact(actual_parts, op_parts):
+    """parquet 캐시에서 part fingerprint 가 그대로인 월은 재사용하고, 바뀌거나 새로 생긴 part 의 월만 다시 만든다.
+    actual_parts / op_parts: {part 라벨: (fingerprint, SourcePart)}
+    상품 계층 정의가 바뀌면 구분1~구분4 가 달라지므로 캐시 전체를 버린다."""
+    fingerprints = {'actual': {label: fingerprint for label, (fingerprint, _) in actual_parts.items()},
+                    'op': {label: fingerprint for label, (fingerprint, _) in op_parts.items()},
+                    'hierarchy': hierarchy_version}
+    cached, cached_fingerprints = None, {'actual': {}, 'op': {}}
+    if os.path.exists(loan_fact_cache_path):
+        table = pq.read_table(loan_fact_cache_path)
+        parts = json.loads((table.schema.metadata or {}).get(b'parts', b'{}'))
+        if parts.get('hierarchy') == hierarchy_version:
+            cached, cached_fingerprints = table.to_pandas(), parts
+
+    if cached is not None and cached_fingerprints == fingerprints:
+        return cached
+
+    changed = [part for side, parts in [('actual', actual_parts), ('op', op_parts)]
+               for label, (fingerprint, part) in parts.items() if cached_fingerprints[side].get(label) != fingerprint]
+
+    rebuild_months = set().union(*(part.months for part in changed))
+    current_months = set().union(*(part.months for _, part in [*actual_parts.values(), *op_parts.values()]))
+
+    def side_series(parts):
+        series = [part.loan_series[part.loan_series.index.get_level_values(0).isin(rebuild_months)]
+                  for _, part in parts.values() if part.months & rebuild_months]
+        return pd.concat(series) if series else None
+
+    pieces = []
+    if cached is not None:
+        keep = cached['기준년월'].isin(current_months - rebuild_months)
+        pieces.append(cached[keep])
+    if rebuild_months:
+        actual, op = side_series(actual_parts), side_series(op_parts)
+        # 한쪽 part 가 없는 월만 바뀐 경우 빈 series 로 join
+        template = actual if actual is not None else op
+        pieces.append(join_loan_fact(actual if actual is not None else template.iloc[:0].rename('actual_eok'),
+                                     op if op is not None else template.iloc[:0].rename('op_eok')))
+    loan_fact = pd.concat(pieces, ignore_index=True).sort_values(['기준년월', *groups], kind='stable').reset_index(drop=True)
+
+    table = pa.Table.from_pandas(loan_fact, preserve_index=False)
+    # 대시보드 / API / 배치 프로세스가 같은 캐시를 읽으므로 임시 파일에 쓴 뒤 교체
+    staging = f'{loan_fact_cache_path}.{os.getpid()}.tmp'
+    pq.write_table(table.replace_schema_metadata({**table.schema.metadata, b'parts': json.dumps(fingerprints, sort_keys=True).encode()}),
+                   staging)
+    os.replace(staging, loan_fact_cache_path)
+    return loan_fact
+
+def unmatched_loan_keys(loan_fact):
+    """실적/OP 가 모두 있는 월에서 한쪽에만 존재하는 키 (inner join 이면 조용히 빠지던 행)"""
+    actual_months = set(loan_fact.loc[loan_fact['actual_eok'].notna(), '기준년월'])
+    op_months = set(loan_fact.loc[loan_fact['op_eok'].notna(), '기준년월'])
+    in_both = loan_fact['기준년월'].isin(actual_months & op_months)
+    return loan_fact[in_both & (loan_fact['actual_eok'].isna() | loan_fact['op_eok'].isna())]
+
+# KPI 집계 큐브 (기준년월 x 구분 사전 집계)
+# 원본별로 따로 집계해 두고 합친다 - 원본 하나가 바뀌면 그 원본의 집계만 다시 만든다
+# 각 함수는 {큐브 이름: 기준년월이 첫 레벨인 집계} 를 반환 - 월 파티션 part 별로도 그대로 쓸 수 있다
+# 큐브는 build_ytd_index 로 월 x 구분 배열이 되고, 당월 값과 누적 값을 모두 그 배열에서 꺼낸다
+def aggregate_handover(df_handover):
+    handover = df_handover.groupby(['기준년월', '상품구분'], observed=True)[['인수율분자값', '인수율분모']].sum()
+    # (기준년월, 상품구분) -> (numerator, denominator)
+    return {'handover': handover.set_axis(['numerator', 'denominator'], axis=1)}
+
+def aggregate_loan(df_loan_amt):
+    # (기준년월, 상품구분, 상품구분_세부) -> 취급액 (상품군 합은 ProductGroup.actual_keys 로 조회)
+    return {'loan': df_loan_amt.groupby(['기준년월', '상품구분', '상품구분_세부'], observed=True)['취급액'].sum()}
+
+def aggregate_op_handover(op_handover):
+    # (bas_yrmn, product) -> (numerator, denominator)
+    return {'op_handover': op_handover.groupby(['bas_yrmn', 'product'], observed=True)[['numerator', 'denominator']].sum()}
+
+def aggregate_op_loan(op_loan_amt):
+    # (bas_yrmn, product) -> value
+    return {'op_loan': op_loan_amt.groupby(['bas_yrmn', 'product'], observed=True)['value'].sum()}
+
+source_aggregators = {
+    'df_handover': aggregate_handover,
+    'df_loan_amt': aggregate_loan,
+    'op_handover': aggregate_op_handover,
+    'op_loan_amt': aggregate_op_loan,
+}
+
+def assemble_kpi_cube(parts, loan_fact):
+    """part 별 집계(월이 겹치지 않음)를 이어 붙여 큐브 이름별 월 x 구분 인덱스를 만든다"""
+    kpi_cube, aggregates = {}, {}
+    for part in parts:
+        for key, grouped in part.aggregates.items():
+            aggregates.setdefault(key, []).append(grouped)
+    for key, grouped in aggregates.items():
+        kpi_cube[key] = build_ytd_index(pd.concat(grouped) if len(grouped) > 1 else grouped[0])
+    kpi_cube['loan_fact'] = build_ytd_index(loan_fact.set_index(['기준년월', *groups])[['actual_eok', 'op_eok']].fillna(0))
+    return kpi_cube
+
+
+# 월별 내용 digest / 월 버전 (원본이 다시 써져도 내용이 같은 월은 캐시를 유지)
+def month_digests(frame, month_column):
+    """월별 행 hash 합 (uint64, 행 순서 무관)"""
+    hashes = pd.util.hash_pandas_object(frame, index=False)
+    return {str(month): int(digest) for month, digest in hashes.groupby(frame[month_column], observed=True).sum().items()}
+
+def month_versions(digests, months):
+    """월별 표 캐시 키. 표가 읽는 월(전월, 해당 연도 1월 ~ 당월)의 원본 digest 와 상품 계층 버전으로 만든다"""
+    versions = {}
+    for month in months:
+        dependencies = sorted({previous_month(month), *(f'{month[:4]}{number:02d}' for number in range(1, int(month[4:]) + 1))})
+        payload = [[name, [source_digests.get(dependency, 0) for dependency in dependencies]]
+                   for name, source_digests in sorted(digests.items())]
+        versions[month] = hashlib.sha1(json.dumps([month, hierarchy_version, payload]).encode()).hexdigest()[:12]
+    return versions
+
+# 데이터 로드 (원본 읽기 + 사전 집계, 반환값은 읽기 전용)
+# 원본은 part 단위로 읽는다: 평면 파일이면 파일 1개, 월 파티션 데이터셋이면 월 파티션 1개.
+# 읽고 집계한 part 는 fingerprint 가 같은 동안 프로세스 메모리와 공유 저장소(part 집계 파일)에 남겨,
+# 새 월 파티션이 추가되면 어느 프로세스든 그 월만 읽는다.
+loan_series_builders = {'df_loan_amt': actual_loan_series, 'op_loan_amt': op_loan_series}
+
+class SourcePart:
+    """원본 part 하나의 집계 (큐브 집계, 월별 digest, 행 단위 점검 결과, 취급액 fact series).
+    원본 행은 집계가 끝나면 버린다 - part 캐시에는 집계 결과만 남는다"""
+
+    def __init__(self, name, months=None):
+        self.name = name
+        frame = read_source(*source_files[name], months=months)
+        self.aggregates = source_aggregators[name](frame)
+        self.digests = month_digests(frame, source_files[name][1])
+        self.months = set(self.digests)
+        self.issues = part_issues(name, frame)
+        # 실적/OP 취급액 원본만 loan_fact 용 (기준년월, 구분1~구분4) series 를 만든다
+        builder = loan_series_builders.get(name)
+        self.loan_series = builder(frame) if builder is not None else None
+
+def source_parts(name):
+    """{part 라벨: fingerprint} - 평면 파일은 '*', 월 파티션은 YYYYMM"""
+    path, month_column = source_files[name][:2]
+    dataset = dataset_path(path)
+    if not os.path.isdir(dataset):
+        return {'*': json.dumps(source_fingerprint(path), sort_keys=True)}
+    return {directory.rsplit('=', 1)[1]: json.dumps(source_fingerprint(*glob.glob(os.path.join(directory, '*.parquet'))), sort_keys=True)
+            for directory in sorted(glob.glob(os.path.join(dataset, f'{month_column}=*')))}
+
+# (원본, part 라벨, fingerprint) -> SourcePart
+part_cache = {}
+
+def read_part(name, label, fingerprint):
+    """원본 part 를 읽어 집계 (label '*' 는 원본 전체)"""
+    return SourcePart(name, None if label == '*' else [label])
+
+def load_source(name, load_part=read_part):
+    """원본 part 별 {라벨: (fingerprint, SourcePart)}. fingerprint 가 같은 part 는 다시 읽지 않는다.
+    메모리에 없는 part 는 load_part 로 만든다 (store.load_part 는 디스크에 저장된 part 집계를 먼저 본다)"""
+    parts = {}
+    for label, fingerprint in source_parts(name).items():
+        key = (name, label, fingerprint)
+        if key not in part_cache:
+            part_cache[key] = load_part(name, label, fingerprint)
+        parts[label] = (fingerprint, part_cache[key])
+    # 없어지거나 바뀐 part 는 메모리에서 제거
+    for key in [key for key in part_cache if key[0] == name and parts.get(key[1], (None,))[0] != key[2]]:
+        del part_cache[key]
+    return parts
+
+class LoanFactStore:
+    """기준년월 순으로 정렬된 loan_fact Arrow 테이블. 월 slice 만 pandas 로 꺼낸다 (공유 저장소에서 열면 memory-map)"""
+
+    def __init__(self, table, offsets):
+        self.table = table
+        # 기준년월 -> (시작 행, 행 수)
+        self.offsets = offsets
+
+    @classmethod
+    def from_frame(cls, loan_fact):
+        frame = loan_fact.fillna({'actual_eok': 0, 'op_eok': 0}).astype({column: str for column in ['기준년월', *groups]})
+        months, starts, counts = np.unique(frame['기준년월'].to_numpy(), return_index=True, return_counts=True)
+        return cls(pa.Table.from_pandas(frame, preserve_index=False),
+                   {month: (int(start), int(count)) for month, start, count in zip(months, starts, counts)})
+
+    def month(self, month):
+        """month 행 (기준년월, 구분1~구분4, actual_eok, op_eok) - 없는 월이면 빈 DataFrame"""
+        return self.table.slice(*self.offsets.get(month, (0, 0))).to_pandas()
+
+def assemble_bundle(sources, data_version):
+    """원본별 load_source 결과를 합쳐 대시보드 데이터 묶음을 만든다.
+    월별 집계는 part 결과를 이어 붙이기만 하고, 누적 prefix sum 만 전체로 다시 만든다."""
+    loan_fact = load_loan_fact(sources['df_loan_amt'], sources['op_loan_amt'])
+    kpi_cube = assemble_kpi_cube([part for name in source_files for _, part in sources[name].values()], loan_fact)
+    digests = {name: {month: digest for _, part in parts.values() for month, digest in part.digests.items()}
+               for name, parts in sources.items()}
+    months = sorted(filter(is_month, digests['df_handover']), reverse=True)
+    quality_report = validation_report([issue for parts in sources.values() for _, part in parts.values() for issue in part.issues],
+                                       digests, months, unmatched_loan_keys(loan_fact),
+                                       stale_flat_files([source[0] for source in source_files.values()]))
+    return months, kpi_cube, LoanFactStore.from_frame(loan_fact), quality_report, data_version, month_versions(digests, months)
+
+def current_data_version():
+    """원본 수정시각/크기 기반 fingerprint (원본 전체 단위 캐시 키)"""
+    fingerprint = source_fingerprint(*(source[0] for source in source_files.values()))
+    return hashlib.sha1(json.dumps(fingerprint, sort_keys=True).encode()).hexdigest()[:12]
+
+def previous_month(month):
+    """YYYYMM 의 전월 (1월이면 전년 12월)"""
+    if month.endswith('01'):
+        return str(int(month[:4]) - 1) + '12'
+    return month[:4] + str(int(month[4:]) - 1).zfill(2)
+
+def table_headers(month):
+    """표 상단 (당월, 누적) 헤더 문구"""
+    year_short, month_num = month[2:4], int(month[4:])
+    return f"당월('{year_short}.{month_num}월)", f"누적('{year_short}.1~{month_num}월)"
+
+# === 취급지표 표 ===
+# 인수율 구성 상품 (실적/OP 모두 상품구분/product = 할부, 임대)
+handover_products = ['할부', '임대']
+
+def compile_kpi_sections(product_groups):
+    """상품 계층 -> (취급액 구성 상품, 표 행 순서).
+    취급액 구성 상품은 상품군(구분2) -> (실적 cube 키 목록, OP product 목록),
+    표 행 순서는 (합계 행 이름, 단위, 구성 상품) 목록 - 취급액 구성 상품은 구분1 별 상품군"""
+    loan_products = {name: (group.actual_keys, list(group.products)) for name, group in product_groups.items()}
+    kpi_sections = [
+        ('신차_통합인수율', 'rate', handover_products),
+        ('신차_취급액', 'amount', [name for name, group in product_groups.items() if group.division == '신차']),
+        ('중고_취급액', 'amount', [name for name, group in product_groups.items() if group.division == '중고']),
+    ]
+    return loan_products, kpi_sections
+
+loan_products, kpi_sections = compile_kpi_sections(product_groups)
+
+@dataclass(frozen=True)
+class KpiRow:
+    """취급지표 한 행. kind 가 'rate' 면 인수율(%), 'amount' 면 취급액(억원)"""
+    label: str
+    kind: str
+    is_total: bool
+    op: float
+    actual: float
+    prev_actual: float
+    ytd_op: float
+    ytd_actual: float
+
+    @property
+    def display_label(self):
+        """구성 상품 행은 '• ' 들여쓰기"""
+        return self.label if self.is_total else f'• {self.label}'
+
+    @property
+    def achievement(self):
+        return (self.actual / self.op * 100) if self.op > 0 else 0
+
+    @property
+    def progress(self):
+        """진척비 (인수율 행은 없음)"""
+        return None if self.kind == 'rate' else self.achievement - 100
+
+    @property
+    def mom(self):
+        return self.actual - self.prev_actual
+
+    @property
+    def ytd_achievement(self):
+        return (self.ytd_actual / self.ytd_op * 100) if self.ytd_op > 0 else 0
+
+    def cells(self):
+        """표시용 문자열 [OP, 실적, 달성률, 진척비, 전월대비, 누적OP, 누적실적, 누적달성률]"""
+        if self.kind == 'rate':
+            value, mom = "{:.1f}%", f"{self.mom:+.1f}%p"
+        else:
+            value, mom = "{:,.0f}", f"{self.mom:+,.0f}"
+        return [
+            value.format(self.op), value.format(self.actual), f"{self.achievement:+.1f}%",
+            '-' if self.progress is None else f"{self.progress:+.1f}%", mom,
+            value.format(self.ytd_op), value.format(self.ytd_actual), f"{self.ytd_achievement:.1f}%",
+        ]
+
+@dataclass(frozen=True)
+class KpiTable:
+    month: str
+    month_header: str
+    cumulative_header: str
+    rows: list
+
+    def total(self, label):
+        return next(row for row in self.rows if row.label == label)
+
+    def to_frame(self):
+        """다운로드/배치용 2단 헤더 DataFrame"""
+        columns = [('구분', ''), *((self.month_header, name) for name in ['OP', '실적', '달성률', '진척비', '전월대비']),
+                   *((self.cumulative_header, name) for name in ['누적OP', '누적실적', '누적달성률'])]
+        return pd.DataFrame([[row.display_label, *row.cells()] for row in self.rows],
+                            columns=pd.MultiIndex.from_tuples(columns))
+
+    def values_frame(self):
+        """숫자 값 DataFrame (API 용). 진척비는 인수율 행이면 NaN"""
+        return pd.DataFrame([{
+            '구분': row.label, '합계': row.is_total, '단위': '%' if row.kind == 'rate' else '억원',
+            'OP': row.op, '실적': row.actual, '달성률': row.achievement,
+            '진척비': np.nan if row.progress is None else row.progress, '전월대비': row.mom,
+            '누적OP': row.ytd_op, '누적실적': row.ytd_actual, '누적달성률': row.ytd_achievement,
+        } for row in self.rows])
+
+def compute_kpi_table(kpi_cube, month, scenario=()):
+    """기준년월 month 의 취급지표 (당월/OP/전월/누적) - 합계 행은 구성 상품 값의 합.
+    scenario 가 있으면 취급액 OP 에 상품군별 시나리오 증감을 더한다"""
+    prev_month = previous_month(month)
+    op_deltas = scenario_op_deltas(kpi_cube, month, scenario) if scenario else {}
+
+    components = {}
+    for product in handover_products:
+        components['rate', product] = (
+            month_rate(kpi_cube['op_handover'], month, product),
+            month_rate(kpi_cube['handover'], month, product),
+            month_rate(kpi_cube['handover'], prev_month, product),
+            ytd_rate(kpi_cube['op_handover'], month, product),
+            ytd_rate(kpi_cube['handover'], month, product),
+        )
+    for product, (actual_keys, op_products) in loan_products.items():
+        op_keys = [(op_product,) for op_product in op_products]
+        op_delta, ytd_op_delta = op_deltas.get(product, (0, 0))
+        components['amount', product] = (
+            month_sum(kpi_cube['op_loan'], month, *op_keys) + op_delta,
+            month_sum(kpi_cube['loan'], month, *actual_keys) / 1e8,
+            month_sum(kpi_cube['loan'], prev_month, *actual_keys) / 1e8,
+            ytd_sum(kpi_cube['op_loan'], month, *op_keys) + ytd_op_delta,
+            ytd_sum(kpi_cube['loan'], month, *actual_keys) / 1e8,
+        )
+
+    rows = []
+    for label, kind, products in kpi_sections:
+        values = [components[kind, product] for product in products]
+        rows.append(KpiRow(label, kind, True, *(sum(measure) for measure in zip(*values))))
+        rows.extend(KpiRow(product, kind, False, *value) for product, value in zip(products, values))
+    return KpiTable(month, *table_headers(month), rows)
+
+# === 월별 추이 ===
+def monthly_sum(index, months, *keys):
+    """누적 인덱스의 월 x 컬럼 값에서 keys 컬럼 합을 months 순서로 (없는 월 0)"""
+    columns = sorted({position for key in keys for position in index['positions'].get(key, [])})
+    return pd.Series(index['values'][:, columns].sum(axis=1), index=index['months']).reindex(months, fill_value=0.0)
+
+def monthly_rate(index, months, product):
+    """월별 인수율(%) - 분모가 0 인 월은 0"""
+    numerator, denominator = (monthly_sum(index, months, (measure, product)) for measure in ['numerator', 'denominator'])
+    return (numerator / denominator * 100).where(denominator > 0, 0.0)
+
+def compute_trend(kpi_cube, months):
+    """kpi_sections 합계 행의 월별 (OP, 실적) 추이. 취급지표 표와 같은 구성 상품 정의/합산 규칙을 쓰므로
+    각 월 값은 그 월 취급지표 표의 합계 행과 같다. 반환: 기준년월(오름차순) index, (합계 행 이름, OP/실적) 컬럼"""
+    months = sorted(months)
+    components = {}
+    for product in handover_products:
+        components['rate', product] = (monthly_rate(kpi_cube['op_handover'], months, product),
+                                       monthly_rate(kpi_cube['handover'], months, product))
+    for product, (actual_keys, op_products) in loan_products.items():
+        components['amount', product] = (monthly_sum(kpi_cube['op_loan'], months, *((op_product,) for op_product in op_products)),
+                                          monthly_sum(kpi_cube['loan'], months, *actual_keys) / 1e8)
+    columns = {}
+    for label, kind, products in kpi_sections:
+        op, actual = (sum(measure) for measure in zip(*(components[kind, product] for product in products)))
+        columns[label, 'OP'], columns[label, '실적'] = op, actual
+    return pd.DataFrame(columns).rename_axis('기준년월')
+
+# === 상품별 취급액 표 ===
+# 정렬 순서 / 소계 레벨은 상품 계층(product_groups)에서 컴파일된 group_rank / subtotal_levels 를 쓴다
+# 구분3 이 부서인 상품군은 구분4 순서로 정렬된다
+def add_subtotals(leaf, value_columns):
+    """정렬된 leaf 행에 계층 소계 행을 한 번에 붙여 반환.
+    소계 행은 하위 구분을 'total' 로 채우고, 그룹의 첫 leaf 바로 앞에 위치한다.
+    _level 은 소계 깊이 (0 = 구분1 소계, len(subtotal_levels) = leaf),
+    [_order, _end) 는 행이 합산하는 leaf 구간 - leaf 가 구분1~구분4 순으로 정렬돼 있어 소계의 leaf 는 연속 구간이다"""
+    leaf = leaf.reset_index(drop=True).assign(_order=np.arange(len(leaf)), _end=np.arange(1, len(leaf) + 1),
+                                              _level=len(subtotal_levels))
+    parts = [leaf]
+    for depth, (column, values) in enumerate(subtotal_levels, start=1):
+        scope = leaf if values is None else leaf[leaf[column].isin(values)]
+        rollup = (scope.groupby(groups[:depth], sort=False)
+                  .agg({**{value: 'sum' for value in value_columns}, '_order': 'min', '_end': 'max'})
+                  .reset_index())
+        parts.append(rollup.assign(**{rest: 'total' for rest in groups[depth:]}, _level=depth - 1))
+    return (pd.concat(parts, ignore_index=True)
+            .sort_values(['_order', '_level'], kind='stable')
+            .reset_index(drop=True)[[*groups, '_level', '_order', '_end', *value_columns]])
+
+def sort_groups(grouped):
+    """group_rank 정수 순위로 구분1~구분4 다중 키 정렬"""
+    ranks = {f'_{column}': grouped[column].map(group_rank[column]).fillna(len(group_rank[column])) for column in groups}
+    return grouped.assign(**ranks).sort_values(list(ranks), kind='stable').drop(columns=list(ranks))
+
+def product_labels(result):
+    """add_subtotals 결과 행의 표시 구분. 소계 행은 해당 레벨 값,
+    상품별로 나누는 상품군(임대)의 부서 행은 부서만, 나머지 행은 '상품군 - 부서'"""
+    is_total = result[groups] == 'total'
+    return np.select(
+        [is_total['구분2'], is_total['구분3'], is_total['구분4'], result['구분2'].isin(split_groups)],
+        [result['구분1'], result['구분2'], result['구분3'], result['구분4']],
+        default=result['구분2'] + ' - ' + result['구분4'])
+
+@dataclass(frozen=True)
+class ProductTable:
+    """상품별 취급액 표. frame 은 구분 + 숫자 컬럼 (억원, 달성률 %), levels 는 행별 소계 깊이 (add_subtotals 의 _level),
+    keys 는 행별 구분1~구분4 (소계 행의 하위 구분은 None) - 표시용 구분 문구만으로는 같은 부서 행이 구별되지 않는다"""
+    month: str
+    month_header: str
+    cumulative_header: str
+    frame: pd.DataFrame
+    levels: tuple
+    keys: pd.DataFrame
+    # OP 시나리오용: leaf 행의 (상품, 부서) 키, 행별 합산 leaf 구간 [start, end) (소계 = 하위 leaf 합), leaf 의 (당월_OP, 누적_OP)
+    leaf_keys: pd.MultiIndex
+    leaf_spans: np.ndarray
+    leaf_op: np.ndarray
+
+    def to_frame(self):
+        """표시/다운로드용 문자열 표"""
+        formats = {'당월_OP': "{:,.2f}", '당월_실적': "{:,.2f}", '당월_달성률': "{:.2f}%", '전월대비': "{:+,.2f}",
+                   '누적_OP': "{:,.2f}", '누적_실적': "{:,.2f}", '누적_달성률': "{:.2f}%"}
+        return self.frame.assign(**{column: [fmt.format(value) for value in self.frame[column]]
+                                    for column, fmt in formats.items()})
+
+    def values_frame(self):
+        """숫자 값 DataFrame (API / 배치 parquet 용) - 행별 구분1~구분4, 소계 깊이 포함"""
+        return pd.concat([self.keys, self.frame], axis=1).assign(소계깊이=list(self.levels))
+
+    def with_scenario(self, scenario):
+        """OP 시나리오를 적용한 표. leaf OP 에 배율 배열을 곱하고 행별 leaf 구간 합으로 소계를 다시 만든 뒤
+        OP / 달성률 컬럼만 바꾼다 (실적/전월대비와 행 구성은 그대로). 빈 시나리오면 자기 자신"""
+        if not scenario:
+            return self
+        op = span_sums(self.leaf_op * scenario_multipliers(self.leaf_keys, scenario)[:, None], self.leaf_spans)
+        frame = self.frame.assign(당월_OP=op[:, 0], 누적_OP=op[:, 1])
+        return replace(self, frame=frame.assign(당월_달성률=achievement_rate(frame['당월_실적'], frame['당월_OP']),
+                                                누적_달성률=achievement_rate(frame['누적_실적'], frame['누적_OP'])))
+
+def achievement_rate(actual, op):
+    """달성률(%) = 실적 / OP * 100, OP 가 0 이하면 0"""
+    return (actual / op * 100).where(op > 0, 0)
+
+def compute_product_table(kpi_cube, loan_fact_by_month, month):
+    """상품별 취급액 표 (당월/전월/누적 fact 테이블 slice + 소계)"""
+    def month_slice(month):
+        return loan_fact_by_month.month(month).drop(columns='기준년월').set_index(groups)
+
+    prev_loan_data = month_slice(previous_month(month))
+    has_prev_month = not prev_loan_data.empty
+
+    product_leaf = pd.concat([
+        month_slice(month).rename(columns={'actual_eok': '당월_실적', 'op_eok': '당월_OP'}),
+        prev_loan_data[['actual_eok']].rename(columns={'actual_eok': '전월_실적'}),
+        ytd_frame(kpi_cube['loan_fact'], month).set_index(groups).rename(columns={'actual_eok': '누적_실적', 'op_eok': '누적_OP'}),
+    ], axis=1).fillna(0).reset_index()
+    result = add_subtotals(sort_groups(product_leaf), ['당월_OP', '당월_실적', '전월_실적', '누적_OP', '누적_실적'])
+
+    frame = pd.DataFrame({
+        '구분': product_labels(result),
+        '당월_OP': result['당월_OP'],
+        '당월_실적': result['당월_실적'],
+        '당월_달성률': achievement_rate(result['당월_실적'], result['당월_OP']),
+        # 전월 데이터가 없으면 0
+        '전월대비': (result['당월_실적'] - result['전월_실적']) if has_prev_month else 0.0,
+        '누적_OP': result['누적_OP'],
+        '누적_실적': result['누적_실적'],
+        '누적_달성률': achievement_rate(result['누적_실적'], result['누적_OP']),
+    })
+    leaf = result[result['_level'] == len(subtotal_levels)]
+    return ProductTable(month, *table_headers(month), frame, tuple(result['_level']),
+                        result[groups].where(result[groups] != 'total', None),
+                        scenario_index(leaf), result[['_order', '_end']].to_numpy(), leaf[['당월_OP', '누적_OP']].to_numpy())
+
+# === OP 시나리오 (what-if) ===
+# 시나리오는 ((상품, 부서), OP 배율) 쌍의 tuple (캐시 키로 그대로 쓴다). 상품은 상품군(구분2), 상품별로 나누는
+# 상품군(임대)은 상품(구분3) - 상품별 취급액 표의 leaf 단위 (할부연장 OP 는 할부 leaf 에 합쳐져 있어 따로 조정하지 않는다).
+# 원본/집계는 다시 읽거나 묶지 않고, 이미 만든 leaf OP 집계에 배율 배열을 곱해 소계와 달성률/진척비만 다시 계산한다.
+def scenario_products(leaf):
+    """leaf 행(구분1~구분4)의 시나리오 상품 키"""
+    return np.where(leaf['구분2'].isin(split_groups), leaf['구분3'], leaf['구분2'])
+
+def scenario_index(leaf):
+    """leaf 행 순서의 (상품, 부서) MultiIndex - 시나리오 배율을 reindex 로 배열로 펼칠 때 쓴다"""
+    return pd.MultiIndex.from_arrays([scenario_products(leaf), leaf['구분4'].to_numpy()])
+
+def span_sums(values, spans):
+    """행별 [start, end) 구간의 values 합. 끝에 0 행을 붙여 end 가 len(values) 여도 reduceat 색인이 되게 하고,
+    (start, end) 를 번갈아 넣은 reduceat 결과에서 짝수 번째(= start~end 합)만 쓴다 - 행 + leaf 수에 비례"""
+    padded = np.vstack([values, np.zeros((1, values.shape[1]))])
+    return np.add.reduceat(padded, spans.ravel(), axis=0)[::2]
+
+def scenario_keys(kpi_cube):
+    """시나리오로 조정할 수 있는 (상품, 부서) 목록 - OP 가 있는 leaf, 상품별 취급액 표 순서"""
+    leaf = sort_groups(pd.DataFrame([column[1:] for column in kpi_cube['loan_fact']['columns'] if column[0] == 'op_eok'],
+                                    columns=groups))
+    return list(dict.fromkeys(zip(scenario_products(leaf), leaf['구분4'])))
+
+def scenario_multipliers(keys, scenario):
+    """(상품, 부서) keys 순서의 OP 배율 배열 (시나리오에 없는 키는 1)"""
+    return pd.Series(dict(scenario), dtype=float).reindex(keys, fill_value=1.0).to_numpy()
+
+def scenario_op_deltas(kpi_cube, month, scenario):
+    """상품군(구분2)별 시나리오 OP 증감 {상품군: (당월, 누적)} - loan_fact 인덱스 leaf OP x (배율 - 1) 의 합"""
+    index = kpi_cube['loan_fact']
+    op_columns = [position for position, column in enumerate(index['columns']) if column[0] == 'op_eok']
+    leaf = pd.DataFrame([index['columns'][position][1:] for position in op_columns], columns=groups)
+    factors = scenario_multipliers(scenario_index(leaf), scenario) - 1
+    values = month_row(index, month)
+    deltas = pd.DataFrame({
+        'month': 0.0 if values is None else values[op_columns] * factors,
+        'ytd': ytd_row(index, month)[op_columns] * factors,
+    }).groupby(leaf['구분2'].to_numpy()).sum()
+    return dict(zip(deltas.index, zip(deltas['month'], deltas['ytd'])))
+
+# === 데이터 점검 (로드 시 1회, part 단위는 part 캐시와 함께 재사용) ===
+def compile_dimension_domains(loan_products, hierarchy_products, departments):
+    """원본별 구분 컬럼의 허용 값 - 상품 계층(product_groups / departments)과 KPI 상품 정의에서 가져온다"""
+    return {
+        'df_handover': {'상품구분': handover_products},
+        'df_loan_amt': {'상품구분': list(dict.fromkeys(key[0] for actual_keys, _ in loan_products.values() for key in actual_keys)),
+                        '상품구분_세부': list(hierarchy_products), '부서': list(departments)},
+        'op_handover': {'product': handover_products},
+        'op_loan_amt': {'product': list(hierarchy_products), 'depart': list(departments)},
+    }
+
+dimension_domains = compile_dimension_domains(loan_products, hierarchy_products, departments)
+quality_columns = ['검사', '원본', '기준년월', '내용']
+
+def part_issues(name, frame):
+    """part 하나의 행 단위 점검: 허용 값 밖의 구분 값, 같은 (월, 구분) 키 중복 -> [(검사, 원본, 기준년월, 내용)]"""
+    month_column, key_columns = source_files[name][1], source_files[name][3]
+    issues = []
+    for column, allowed in dimension_domains[name].items():
+        unknown = frame.loc[~frame[column].isin(allowed), [month_column, column]].drop_duplicates()
+        issues.extend(('구분 값', name, str(month), f"{column} 에 정의되지 않은 값 '{value}' (표에서 맨 뒤로 정렬)")
+                      for month, value in unknown.itertuples(index=False))
+    duplicated = frame.loc[frame.duplicated(key_columns, keep=False), month_column].value_counts(sort=False)
+    issues.extend(('중복 키', name, str(month), f"{'/'.join(key_columns[1:])} 가 같은 행 {count}건 (합산됨)")
+                  for month, count in duplicated[duplicated > 0].items())
+    return issues
+
+def validation_report(part_issue_rows, digests, months, unmatched_keys, stale_files=()):
+    """part 점검 결과에 월 형식/누락, 실적-OP 월 범위, 실적/OP 한쪽에만 있는 취급액 키, 파티션보다 최신인 평면 파일 점검을 더한 DataFrame"""
+    issues = list(part_issue_rows)
+    issues.extend(('원본 최신성', os.path.basename(path), '',
+                   '평면 파일이 월 파티션 데이터셋보다 최신 (대시보드는 데이터셋을 읽음 - partition_sources.py 재실행 필요)')
+                  for path in stale_files)
+    for name, source_digests in digests.items():
+        valid = sorted(filter(is_month, source_digests))
+        issues.extend(('월 형식', name, month, 'YYYYMM 형식이 아님 (월별 표에서 제외)') for month in sorted(set(source_digests) - set(valid)))
+        if valid:
+            expected = pd.period_range(pd.Period(valid[0], 'M'), pd.Period(valid[-1], 'M'), freq='M').strftime('%Y%m')
+            issues.extend(('월 누락', name, month, '중간 월 데이터 없음') for month in expected.difference(valid))
+        if name != 'df_handover':
+            issues.extend(('월 범위', name, month, '실적 월에 해당 원본 데이터 없음 (0 으로 표시)')
+                          for month in sorted(set(months) - set(source_digests)))
+    issues.extend(('실적/OP 키', 'loan_fact', row['기준년월'],
+                   f"{'/'.join(row[groups])} {'OP 없음' if pd.isna(row['op_eok']) else '실적 없음'} (0 으로 표시)")
+                  for _, row in unmatched_keys.iterrows())
+    return pd.DataFrame(issues, columns=quality_columns)
+
+# === 월별 표 사전 계산 ===
+class MonthTableStore:
+    """모든 월의 (KpiTable, ProductTable) 을 background thread pool 에서 미리 계산해 보관.
+    months 순서대로 (최근 월부터) 계산하며, 생성자는 작업만 등록하고 바로 반환한다."""
+
+    def __init__(self, kpi_cube, loan_fact_by_month, months, month_versions, max_workers=2, previous=None):
+        self.kpi_cube = kpi_cube
+        self.loan_fact_by_month = loan_fact_by_month
+        self.month_versions = month_versions
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='month-warmup')
+        self.futures = {}
+        for month in months:
+            # 이전 store 에서 월 버전이 같고 계산이 끝난 월은 그대로 재사용
+            reused = previous.get(month) if previous is not None and previous.month_versions.get(month) == month_versions[month] else None
+            if reused is not None:
+                self.futures[month] = Future()
+                self.futures[month].set_result(reused)
+            else:
+                self.futures[month] = executor.submit(self.compute, month)
+        # 등록된 작업은 끝까지 실행되고, 끝나면 worker thread 도 정리된다
+        executor.shutdown(wait=False)
+
+    def compute(self, month):
+        return (compute_kpi_table(self.kpi_cube, month),
+                compute_product_table(self.kpi_cube, self.loan_fact_by_month, month))
+
+    def get(self, month):
+        """계산이 끝난 월이면 (KpiTable, ProductTable), 아직이면 None"""
+        future = self.futures.get(month)
+        return future.result() if future is not None and future.done() else None
+
+    def progress(self):
+        """(완료 월 수, 전체 월 수)"""
+        return sum(future.done() for future in self.futures.values()), len(self.futures)
@@ -0,0 +1,166 @@
+"""원본 parquet 를 월(기준년월/bas_yrmn) hive 파티션 데이터셋으로 재작성하는 선택적 ingestion 단계
+
+    python partition_sources.py [--source-dir .] [--output-dir partitioned] [--row-group-size 65536]
+    python partition_sources.py --append 신규월.parquet --dataset df_loan_amt_summary_monthly [--replace]
+
+결과는 <output-dir>/<파일명>/<월 컬럼>=YYYYMM/part-0.parquet 형태이며, 파티션 내부는 일자 컬럼 순으로
+정렬하고 row group 통계(min/max)를 기록한다. app_temp.py 는 partitioned/<파일명>/ 이 있으면 원본 대신
+이 데이터셋을 읽고, 월 조건은 파티션 디렉터리 단위로 걸러진다.
+
+--append 는 한 달치 파일을 기존 데이터셋의 새 월 파티션으로만 추가한다 (전체 재작성 없음).
+기존 파티션과 컬럼/타입이 같은지(string / large_string 은 같은 타입으로 보고 기존 스키마로 맞춰 쓴다),
+상품구분/부서/OP product 값이 상품 계층(engine.dimension_domains)에 있는 값인지 확인하고
+문제가 있으면 아무것도 쓰지 않는다. 대시보드는 새 파티션만 읽어 기존 월 집계에 붙인다.
+이미 있는 월은 --replace 일 때만 파티션 안의 part 파일을 os.replace 한 번으로 바꿔 끼운다.
+"""
+import argparse
+import glob
+import os
+import shutil
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from engine import dimension_domains, source_files
+
+# 파티션 키로 쓰는 월 컬럼 (실적: 기준년월, OP: bas_yrmn)
+month_columns = ('기준년월', 'bas_yrmn')
+# 파티션 내부 정렬 기준 일자 컬럼
+date_columns = ('기준일자', '기준년월일')
+# 파티션마다 파일 하나 (--append --replace 는 이 파일만 바꿔 끼운다)
+part_file = 'part-0.parquet'
+
+def comparable_type(data_type):
+    """스키마 비교용 타입 - pandas 버전에 따라 string / large_string 으로 써지는 차이는 무시"""
+    return pa.string() if pa.types.is_large_string(data_type) else data_type
+
+
+def write_partition(table, month_column, month, path, row_group_size):
+    """table 에서 month 행만 일자 순으로 정렬해 path 에 parquet 로 쓴다"""
+    part = table.filter(pc.equal(table[month_column], month)).drop_columns([month_column])
+    sort_keys = [(column, 'ascending') for column in date_columns if column in part.column_names]
+    if sort_keys:
+        part = part.sort_by(sort_keys)
+    pq.write_table(part, path, row_group_size=row_group_size, write_statistics=True)
+
+
+def partition_file(path, output_dir, row_group_size):
+    """path 한 파일을 월 파티션으로 나눠 쓰고, 완성된 뒤에 기존 데이터셋과 교체한다."""
+    table = pq.read_table(path)
+    month_column = next((column for column in month_columns if column in table.column_names), None)
+    if month_column is None:
+        print(f"skip {path}: 월 컬럼 없음")
+        return
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    target = os.path.join(output_dir, name)
+    staging = target + '.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+
+    months = sorted(pc.unique(table[month_column]).to_pylist())
+    for month in months:
+        part_dir = os.path.join(staging, f"{month_column}={month}")
+        os.makedirs(part_dir)
+        write_partition(table, month_column, month, os.path.join(part_dir, part_file), row_group_size)
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(staging, target)
+    print(f"{path} -> {target} ({len(months)} months, {table.num_rows} rows)")
+
+
+def validate_month(table, target):
+    """새 월 파일을 기존 데이터셋 기준으로 검사해 (월 컬럼, 월, 기존 파티션 스키마, 오류 목록) 반환"""
+    partitions = sorted(name for name in os.listdir(target) if '=' in name)
+    month_column = partitions[0].split('=', 1)[0]
+    existing_schema = pq.read_schema(glob.glob(os.path.join(target, partitions[0], '*.parquet'))[0])
+
+    errors = []
+    if month_column not in table.column_names:
+        return month_column, None, existing_schema, [f"월 컬럼 {month_column} 없음"]
+    months = pc.unique(table[month_column].cast(pa.string())).to_pylist()
+    if len(months) != 1 or months[0] is None or not (len(months[0]) == 6 and months[0].isdigit()):
+        return month_column, None, existing_schema, [f"{month_column} 는 YYYYMM 한 달만 있어야 함: {months}"]
+    month = months[0]
+
+    columns = [name for name in table.column_names if name != month_column]
+    if set(columns) != set(existing_schema.names):
+        errors.append(f"컬럼 불일치: 추가 {sorted(set(columns) - set(existing_schema.names))}, "
+                      f"누락 {sorted(set(existing_schema.names) - set(columns))}")
+    else:
+        for field in existing_schema:
+            if not comparable_type(table.schema.field(field.name).type).equals(comparable_type(field.type)):
+                errors.append(f"{field.name} 타입 불일치: {table.schema.field(field.name).type} (기존 {field.type})")
+
+    # 구분 값은 대시보드 데이터 점검과 같은 허용 값(상품 계층)으로 확인 - 기존 파티션을 다시 읽지 않는다
+    name = os.path.basename(os.path.normpath(target))
+    source = next((source for source, (path, *_) in source_files.items() if os.path.splitext(path)[0] == name), None)
+    for column, allowed in dimension_domains.get(source, {}).items():
+        if column not in table.column_names:
+            continue
+        if table[column].null_count:
+            errors.append(f"{column} 에 빈 값 {table[column].null_count}건")
+        unknown = sorted(set(pc.unique(table[column]).to_pylist()) - set(allowed) - {None})
+        if unknown:
+            errors.append(f"{column} 에 상품 계층에 없는 값: {unknown}")
+    return month_column, month, existing_schema, errors
+
+
+def append_month(path, output_dir, dataset, replace, row_group_size):
+    """path(한 달치)를 <output_dir>/<dataset>/<월 컬럼>=YYYYMM 파티션으로 추가. 검사 실패 시 쓰지 않는다"""
+    target = os.path.join(output_dir, dataset)
+    if not os.path.isdir(target):
+        raise SystemExit(f"{target} 없음: 먼저 partition_sources.py 로 전체 파티션을 만들어야 함")
+    table = pq.read_table(path)
+    month_column, month, existing_schema, errors = validate_month(table, target)
+    part_dir = os.path.join(target, f"{month_column}={month}")
+    if month is not None and os.path.isdir(part_dir) and not replace:
+        errors.append(f"{month} 파티션이 이미 있음 (덮어쓰려면 --replace)")
+    if errors:
+        raise SystemExit(f"{path} 추가 실패:\n  " + "\n  ".join(errors))
+
+    # 기존 파티션 스키마로 맞춘다 (월 컬럼은 파티션 디렉터리 값이므로 문자열)
+    schema = pa.schema([pa.field(month_column, pa.string()) if column == month_column else existing_schema.field(column)
+                        for column in table.column_names])
+    table = table.cast(schema)
+    # 다 쓴 뒤 rename 한 번으로 공개한다 (읽는 쪽에 반쯤 쓴 파티션이 보이지 않도록).
+    # 있는 월은 파티션 안 숨김 임시 파일(. 으로 시작, *.parquet 아님)을 part 파일 위로 os.replace - 교체 중에도 월이 비지 않는다.
+    # 새 월은 데이터셋 밖 staging 디렉터리를 통째로 rename (빈 파티션 디렉터리가 보이지 않도록)
+    if os.path.isdir(part_dir):
+        staging = os.path.join(part_dir, f'.{part_file}.{os.getpid()}.tmp')
+        write_partition(table, month_column, month, staging, row_group_size)
+        os.replace(staging, os.path.join(part_dir, part_file))
+    else:
+        staging = f'{target}.append.{os.getpid()}.tmp'
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        write_partition(table, month_column, month, os.path.join(staging, part_file), row_group_size)
+        os.replace(staging, part_dir)
+    print(f"{path} -> {part_dir} ({table.num_rows} rows)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="원본 parquet 월 파티션 재작성")
+    parser.add_argument('--source-dir', default='.')
+    parser.add_argument('--output-dir', default='partitioned')
+    parser.add_argument('--row-group-size', type=int, default=64 * 1024)
+    parser.add_argument('--append', help="한 달치 parquet 를 기존 데이터셋에 새 월 파티션으로 추가")
+    parser.add_argument('--dataset', help="--append 대상 데이터셋 이름 (원본 파일명, 확장자 제외)")
+    parser.add_argument('--replace', action='store_true', help="--append 시 같은 월 파티션이 있으면 교체")
+    args = parser.parse_args()
+
+    if args.append:
+        if not args.dataset:
+            parser.error("--append 에는 --dataset 이 필요함")
+        append_month(args.append, args.output_dir, args.dataset, args.replace, args.row_group_size)
+        return
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for path in sorted(glob.glob(os.path.join(args.source_dir, '*.parquet'))):
+        if path.endswith('.cache.parquet'):
+            continue
+        partition_file(path, args.output_dir, args.row_group_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""구간별 실행시간/메모리 측정 (opt-in)
+
+꺼져 있으면 section() 이 nullcontext 를 돌려주므로 측정 비용이 없다.
+CPU 시간은 프로세스 전체 기준이라 다른 세션이 동시에 돌면 함께 잡힌다.
+"""
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+
+class SectionProfiler:
+    """rerun 한 번 동안 구간별 wall / CPU 시간(ms)과 RSS 변화(MB)를 기록"""
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.records = []
+        if enabled:
+            import psutil
+            self.process = psutil.Process(os.getpid())
+
+    def section(self, name):
+        return self.measure(name) if self.enabled else nullcontext()
+
+    @contextmanager
+    def measure(self, name):
+        rss = self.process.memory_info().rss
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            rss_now = self.process.memory_info().rss
+            self.records.append({
+                'section': name,
+                'wall_ms': round((time.perf_counter() - wall) * 1000, 2),
+                'cpu_ms': round((time.process_time() - cpu) * 1000, 2),
+                'rss_delta_mb': round((rss_now - rss) / 2**20, 2),
+                'rss_mb': round(rss_now / 2**20, 1),
+            })
+
+    def frame(self):
+        return pd.DataFrame(self.records, columns=['section', 'wall_ms', 'cpu_ms', 'rss_delta_mb', 'rss_mb'])
+
+    def append_log(self, path, **context):
+        """rerun 1회를 JSONL 한 줄로 추가 (오프라인 분석용)"""
+        entry = {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), **context, 'sections': self.records}
+        with open(path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(entry, ensure_ascii=False) + '\n')
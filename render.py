@@ -0,0 +1,130 @@
+"""대시보드 표 HTML 과 다운로드 파일 변환 (Streamlit 비의존)
+
+engine 의 KpiTable / ProductTable 을 받아 화면용 HTML 과 xlsx/csv/parquet bytes 를 만든다.
+캐시와 위젯 배치는 app_temp.py 에서 담당한다.
+matplotlib / Excel writer 는 import 비용이 커서 차트나 다운로드를 실제로 만들 때만 불러온다.
+"""
+import importlib.util
+import io
+
+import pandas as pd
+
+# === 표 공통 스타일 (셀마다 style 속성을 반복하지 않고 class 로 지정) ===
+table_css = """
+<style>
+div.dash-table-wrap { overflow-x: auto; margin: 0px; padding: 0px; }
+div.dash-table-wrap table.dash-table { width: 100%; border-collapse: collapse; border: 2px solid #2563eb; border-top: 3px solid #000000; border-bottom: 3px solid #000000; border-radius: 10px; overflow: hidden; box-shadow: 0 6px 15px rgba(0,0,0,0.15); margin: 0px; }
+div.dash-table-wrap table.dash-table th { color: white; font-weight: bold; font-size: 20px; text-align: center; vertical-align: middle; }
+div.dash-table-wrap table.dash-table th.h1 { background: #1e40af; padding: 14px 8px; border: 2px solid #ffffff; text-shadow: 1px 1px 3px rgba(0,0,0,0.4); }
+div.dash-table-wrap table.dash-table th.h2 { background: #2563eb; padding: 10px 6px; border: 1px solid #ffffff; }
+div.dash-table-wrap table.dash-table td { text-align: center; vertical-align: middle; padding: 8px; border: 1px solid #dbeafe; font-size: 20px; }
+div.dash-table-wrap table.dash-table td.total { background-color: #bfdbfe; color: #1e40af; font-weight: bold; }
+div.dash-table-wrap table.dash-table td.subtotal { background-color: #e0f2fe; color: #60a5fa; font-weight: bold; }
+div.dash-table-wrap table.dash-table td.subtotal2 { background-color: #f0f9ff; color: black; font-weight: bold; }
+div.dash-table-wrap table.dash-table td.plain { background-color: white; color: black; font-weight: normal; }
+</style>
+"""
+
+kpi_table_template = """
+<div class="dash-table-wrap"><table class="dash-table">
+<thead>
+<tr><th rowspan="2" class="h1">구분</th><th colspan="5" class="h1">{month_header}</th><th colspan="3" class="h1">{cumulative_header}</th></tr>
+<tr><th class="h2">OP</th><th class="h2">실적</th><th class="h2">달성률</th><th class="h2">진척비</th><th class="h2">전월대비</th><th class="h2">누적OP</th><th class="h2">누적실적</th><th class="h2">누적달성률</th></tr>
+</thead>
+<tbody>{rows}</tbody>
+</table></div>
+"""
+
+product_table_template = """
+<div class="dash-table-wrap"><table class="dash-table">
+<thead>
+<tr><th rowspan="2" class="h1">구분</th><th colspan="4" class="h1">{month_header}</th><th colspan="3" class="h1">{cumulative_header}</th></tr>
+<tr><th class="h2">OP</th><th class="h2">실적</th><th class="h2">달성률</th><th class="h2">전월대비</th><th class="h2">OP</th><th class="h2">실적</th><th class="h2">달성률</th></tr>
+</thead>
+<tbody>{rows}</tbody>
+</table></div>
+"""
+
+# === 취급지표 표 ===
+def create_custom_table_html(kpi_result):
+    rows = []
+    for row in kpi_result.rows:
+        row_class = 'total' if row.is_total else 'plain'
+        cells = [row.display_label, *row.cells()]
+        rows.append('<tr>' + ''.join(f'<td class="{row_class}">{cell}</td>' for cell in cells) + '</tr>')
+
+    return kpi_table_template.format(month_header=kpi_result.month_header, cumulative_header=kpi_result.cumulative_header, rows=''.join(rows))
+
+# === 상품별 취급액 표 ===
+# 모든 셀에 구분별 스타일을 적용 - 행의 소계 깊이(0 = 구분1 소계 ... 마지막 = 부서 행)별 class
+product_row_classes = ['total', 'subtotal', 'subtotal2', 'plain']
+
+def create_product_loan_custom_table_html_fullstyle(product_result):
+    rows = []
+    for level, row in zip(product_result.levels, product_result.to_frame().itertuples(index=False, name=None)):
+        cell_class = product_row_classes[min(level, len(product_row_classes) - 1)]
+        rows.append('<tr>' + ''.join(f'<td class="{cell_class}">{cell}</td>' for cell in row) + '</tr>')
+
+    return product_table_template.format(month_header=product_result.month_header, cumulative_header=product_result.cumulative_header, rows=''.join(rows))
+
+# === 차트 공통 ===
+def register_korean_font(font_path):
+    """matplotlib 에 한글 폰트를 등록하고 기본 글꼴로 지정, 폰트 이름 반환.
+    matplotlib 은 여기서 처음 import 된다 - 프로세스당 1회만 호출 (app 에서는 cache_resource)"""
+    import matplotlib
+    from matplotlib import font_manager
+    font_manager.fontManager.addfont(font_path)
+    font_name = font_manager.FontProperties(fname=font_path).get_name()
+    matplotlib.rcParams['font.family'] = font_name
+    matplotlib.rcParams['axes.unicode_minus'] = False
+    return font_name
+
+# 추이 차트 패널별 단위 (engine.kpi_sections 합계 행 이름 기준, 인수율은 %)
+trend_units = {'신차_통합인수율': '%', '신차_취급액': '억원', '중고_취급액': '억원'}
+
+def trend_chart_png(trend, dpi=110):
+    """compute_trend 결과 -> 합계 행별 실적/OP 꺾은선 패널 PNG bytes.
+    pyplot 상태를 쓰지 않는 Figure 객체로 그려 세션(스레드)끼리 섞이지 않는다. 호출 전에 register_korean_font 필요"""
+    from matplotlib.figure import Figure
+
+    labels = list(dict.fromkeys(label for label, _ in trend.columns))
+    months = list(trend.index)
+    positions = range(len(months))
+    # 월이 많으면 x 눈금은 최대 12개 정도만
+    step = max(1, -(-len(months) // 12))
+    figure = Figure(figsize=(5 * len(labels), 3.6), dpi=dpi, layout='constrained')
+    for axes, label in zip(figure.subplots(1, len(labels), squeeze=False)[0], labels):
+        axes.plot(positions, trend[label, '실적'], marker='o', markersize=3, color='#1f4e79', label='실적')
+        axes.plot(positions, trend[label, 'OP'], linestyle='--', color='#c0504d', label='OP')
+        axes.set_title(f"{label.replace('_', ' ')} ({trend_units.get(label, '')})", fontsize=12)
+        axes.set_xticks(positions[::step], [f"'{month[2:4]}.{int(month[4:])}" for month in months[::step]], fontsize=9)
+        axes.grid(axis='y', alpha=0.3)
+        axes.legend(fontsize=9)
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format='png')
+    return buffer.getvalue()
+
+# === 다운로드 파일 변환 ===
+export_formats = {
+    'xlsx': "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    'csv': "text/csv",
+    'parquet': "application/vnd.apache.parquet",
+}
+# xlsxwriter 가 설치돼 있으면 openpyxl 보다 빠른 writer 사용 (설치 여부만 확인, import 는 to_excel 호출 시)
+excel_engine = 'xlsxwriter' if importlib.util.find_spec('xlsxwriter') else 'openpyxl'
+
+def frame_to_bytes(frame, fmt):
+    """표 DataFrame 을 다운로드 형식(xlsx/csv/parquet)의 bytes 로 변환"""
+    buffer = io.BytesIO()
+    if fmt == 'xlsx':
+        frame.to_excel(buffer, index=True, engine=excel_engine)
+    elif fmt == 'csv':
+        # 엑셀에서 한글이 깨지지 않도록 BOM 포함
+        frame.to_csv(buffer, index=True, encoding='utf-8-sig')
+    else:
+        # parquet 은 문자열 컬럼명만 허용 - 2단 헤더는 '_' 로 이어 붙인다
+        frame = frame.copy()
+        if isinstance(frame.columns, pd.MultiIndex):
+            frame.columns = ['_'.join(filter(None, column)) for column in frame.columns]
+        frame.to_parquet(buffer, index=False)
+    return buffer.getvalue()
@@ -0,0 +1,149 @@
+"""공유 집계 저장소 (여러 서버 프로세스가 같은 파일을 memory-map)
+
+engine 이 원본에서 만든 bundle 을 aggregates/ 아래에 한 번 저장하고, 모든 프로세스가 열기만 하도록 한다.
+part 집계 저장, 저장소 생성 lock, 지난 저장소 정리도 여기서 한다. 표 계산은 engine 이 그대로 담당한다.
+"""
+import fcntl
+import glob
+import hashlib
+import json
+import os
+import pickle
+import shutil
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import engine
+from engine import (LoanFactStore, assemble_bundle, column_positions, current_data_version, load_source, quality_columns,
+                    read_part, source_files)
+
+# aggregates/<데이터 버전>-<상품 계층 버전>-v<형식>/ 에 월 x 구분 배열(aggregates.arrow)과 loan_fact(loan_fact.arrow)를
+# 압축 없는 Arrow IPC 파일로 한 번 쓰고, 모든 프로세스는 memory-map 으로 연다. 배열은 복사 없이 mmap 위의 읽기 전용
+# numpy view 이므로 프로세스들이 같은 물리 페이지를 공유하고, 새 프로세스는 원본을 읽지 않고 바로 시작한다.
+aggregate_store_root = 'aggregates'
+# 저장 형식이나 집계 방식이 바뀌면 올린다 (이전 저장소를 다시 쓰지 않도록).
+# 상품 계층 버전은 engine.hierarchy_version 을 그때그때 읽는다 (계층을 바꾸면 다른 저장소가 된다)
+aggregate_store_format = 2
+
+def aggregate_store_path(data_version):
+    return os.path.join(aggregate_store_root, f'{data_version}-{engine.hierarchy_version}-v{aggregate_store_format}')
+
+# part 집계 (SourcePart) 는 데이터 버전과 무관하게 parts-<상품 계층 버전>-v<형식>/ 에 (원본, 라벨, fingerprint) 별로 둔다.
+# 저장소를 열기만 한 프로세스도 다음 데이터 버전에서 바뀐 part 만 다시 읽는다. 같은 서버가 쓰고 읽는 내부 파일이라
+# pandas 집계 결과를 pickle 로 그대로 저장한다.
+def part_store_directory():
+    return os.path.join(aggregate_store_root, f'parts-{engine.hierarchy_version}-v{aggregate_store_format}')
+
+def part_store_path(name, label, fingerprint):
+    digest = hashlib.sha1(json.dumps([label, fingerprint]).encode()).hexdigest()[:16]
+    return os.path.join(part_store_directory(), f'{name}-{digest}.pkl')
+
+def load_part(name, label, fingerprint):
+    """저장된 part 집계가 있으면 읽고, 없거나 읽을 수 없으면 원본 part 를 읽어 집계한 뒤 저장"""
+    path = part_store_path(name, label, fingerprint)
+    try:
+        with open(path, 'rb') as file:
+            return pickle.load(file)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError):
+        pass
+    part = read_part(name, label, fingerprint)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    staging = f'{path}.{os.getpid()}.tmp'
+    with open(staging, 'wb') as file:
+        pickle.dump(part, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(staging, path)
+    return part
+
+# 저장소 생성 lock - 원본이 바뀌면 여러 프로세스가 동시에 알아채므로 한 프로세스만 만들고 나머지는 기다렸다가 연다.
+# lock 파일 자체가 아니라 열린 파일의 flock 이 lock 이라 잡은 프로세스가 죽으면 커널이 풀어 준다 (lock 파일은 지우지 않는다).
+build_lock_path = os.path.join(aggregate_store_root, 'build.lock')
+
+@contextmanager
+def build_lock(path=build_lock_path):
+    """lock 파일에 배타 flock 을 잡을 때까지 기다린다"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+def save_aggregates(directory, bundle):
+    """bundle 을 directory 에 저장. 임시 디렉터리에 다 쓴 뒤 rename 으로 공개 (다른 프로세스가 먼저 공개했으면 그쪽을 쓴다)"""
+    months, kpi_cube, loan_fact_by_month, quality_report, data_version, versions = bundle
+    arrays, layout, offset = [], {}, 0
+    for name, index in kpi_cube.items():
+        layout[name] = {'months': index['months'], 'columns': index['columns'], 'names': index['names']}
+        for key in ['values', 'prefix']:
+            array = np.ascontiguousarray(index[key], dtype=float)
+            layout[name][key] = [offset, list(array.shape)]
+            arrays.append(array.ravel())
+            offset += array.size
+    metadata = {
+        'months': months, 'data_version': data_version, 'month_versions': versions, 'indexes': layout,
+        'quality_report': quality_report.to_dict(orient='records'),
+    }
+    aggregates = pa.table({'data': np.concatenate(arrays)}).replace_schema_metadata({'bundle': json.dumps(metadata, ensure_ascii=False)})
+    loan_fact = loan_fact_by_month.table.replace_schema_metadata({'offsets': json.dumps(loan_fact_by_month.offsets)})
+
+    staging = f'{directory}.{os.getpid()}.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    for file, table in [('aggregates.arrow', aggregates), ('loan_fact.arrow', loan_fact.combine_chunks())]:
+        with pa.OSFile(os.path.join(staging, file), 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    try:
+        os.replace(staging, directory)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+
+def open_aggregates(directory):
+    """저장소를 memory-map 으로 열어 bundle 로 반환. 배열/테이블은 파일 페이지를 그대로 가리킨다"""
+    aggregates = pa.ipc.open_file(pa.memory_map(os.path.join(directory, 'aggregates.arrow'))).read_all()
+    metadata = json.loads(aggregates.schema.metadata[b'bundle'])
+    data = aggregates['data'].chunk(0).to_numpy(zero_copy_only=True)
+
+    def view(offset, shape):
+        return data[offset:offset + int(np.prod(shape))].reshape(shape)
+
+    kpi_cube = {}
+    for name, entry in metadata['indexes'].items():
+        columns = [tuple(column) for column in entry['columns']]
+        kpi_cube[name] = {'months': entry['months'], 'columns': columns, 'names': entry['names'],
+                          'positions': column_positions(columns), 'values': view(*entry['values']), 'prefix': view(*entry['prefix'])}
+    loan_fact = pa.ipc.open_file(pa.memory_map(os.path.join(directory, 'loan_fact.arrow'))).read_all()
+    offsets = {month: tuple(offset) for month, offset in json.loads(loan_fact.schema.metadata[b'offsets']).items()}
+    return (metadata['months'], kpi_cube, LoanFactStore(loan_fact, offsets),
+            pd.DataFrame(metadata['quality_report'], columns=quality_columns), metadata['data_version'], metadata['month_versions'])
+
+def load_bundle():
+    """현재 원본의 저장소가 있으면 열기만 하고, 없으면 build lock 을 잡고 원본(part 단위)으로 만들어 저장한 뒤 연다.
+    lock 을 기다린 프로세스는 먼저 잡은 프로세스가 만든 저장소를 연다. 새로 만들면 prune_stores 로 오래된 저장소를 지운다"""
+    data_version = current_data_version()
+    directory = aggregate_store_path(data_version)
+    if not os.path.isdir(directory):
+        with build_lock():
+            if not os.path.isdir(directory):
+                sources = {name: load_source(name, load_part) for name in source_files}
+                save_aggregates(directory, assemble_bundle(sources, data_version))
+                prune_stores(directory, {part_store_path(name, label, fingerprint)
+                                         for name, parts in sources.items() for label, (fingerprint, _) in parts.items()})
+    return open_aggregates(directory)
+
+def prune_stores(directory, current_parts):
+    """현재 저장소(directory)와 바로 이전 저장소만 남기고 더 오래된 저장소, 다른 계층/형식의 part 디렉터리,
+    지금 원본에 없는 part 집계를 지운다. 이전 저장소는 이전 버전을 보고 막 열려는 프로세스가 있을 수 있어 남긴다
+    (이미 열어 둔 프로세스의 mmap 은 지워도 유지됨). build lock 을 잡은 채로 부른다"""
+    for stale in glob.glob(os.path.join(part_store_directory(), '*.pkl')):
+        if stale not in current_parts:
+            os.remove(stale)
+    entries = [path for path in glob.glob(os.path.join(aggregate_store_root, '*'))
+               if os.path.isdir(path) and not path.endswith('.tmp') and path not in (directory, part_store_directory())]
+    part_directories = [path for path in entries if os.path.basename(path).startswith('parts-')]
+    stores = sorted(set(entries) - set(part_directories), key=os.path.getmtime, reverse=True)
+    for stale in part_directories + stores[1:]:
+        shutil.rmtree(stale, ignore_errors=True)
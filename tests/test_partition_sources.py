@@ -0,0 +1,87 @@
+"""partition_sources.py --append 검사(validate_month)와 월 파티션 추가/교체(append_month)
+
+배포된 op_car_loan_amt.parquet 를 임시 디렉터리에 월 파티션으로 나눈 뒤 한 달치 파일을 붙인다.
+"""
+import glob
+import os
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import pytest
+
+import partition_sources
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+dataset = 'op_car_loan_amt'
+
+
+@pytest.fixture
+def target(tmp_path):
+    """op_car_loan_amt 월 파티션 데이터셋 디렉터리"""
+    partition_sources.partition_file(os.path.join(repo_root, f'{dataset}.parquet'), str(tmp_path), 64 * 1024)
+    return str(tmp_path / dataset)
+
+
+def month_table(month, **overrides):
+    """배포된 원본의 마지막 월 행을 month 로 바꾼 한 달치 테이블. overrides 는 컬럼 교체"""
+    table = pq.read_table(os.path.join(repo_root, f'{dataset}.parquet'))
+    last = max(pc.unique(table['bas_yrmn']).to_pylist())
+    table = table.filter(pc.equal(table['bas_yrmn'], last)).replace_schema_metadata(None)
+    table = table.set_column(table.schema.get_field_index('bas_yrmn'), 'bas_yrmn', pa.array([month] * table.num_rows))
+    for column, values in overrides.items():
+        if column in table.column_names:
+            table = table.set_column(table.schema.get_field_index(column), column, values)
+        else:
+            table = table.append_column(column, values)
+    return table
+
+
+def append(tmp_path, table, replace=False):
+    path = str(tmp_path / 'new_month.parquet')
+    pq.write_table(table, path)
+    partition_sources.append_month(path, str(tmp_path), dataset, replace, 64 * 1024)
+
+
+def read_month(target, month):
+    return pq.read_table(os.path.join(target, f'bas_yrmn={month}', partition_sources.part_file))
+
+
+def test_column_and_type_mismatch(target):
+    table = month_table('209901')
+    *_, errors = partition_sources.validate_month(table.append_column('memo', pa.array(['x'] * table.num_rows)), target)
+    assert errors == ["컬럼 불일치: 추가 ['memo'], 누락 []"]
+    *_, errors = partition_sources.validate_month(table.set_column(3, 'value', pc.cast(table['value'], pa.float32())), target)
+    assert errors == ['value 타입 불일치: float (기존 double)']
+
+
+def test_unknown_domain_value(target):
+    table = month_table('209901')
+    departments = table['depart'].to_pylist()
+    *_, errors = partition_sources.validate_month(month_table('209901', depart=pa.array(['없는팀', *departments[1:]])), target)
+    assert errors == ["depart 에 상품 계층에 없는 값: ['없는팀']"]
+
+
+def test_existing_month_needs_replace(tmp_path, target):
+    month = sorted(os.listdir(target))[-1].split('=', 1)[1]
+    before = read_month(target, month)
+    with pytest.raises(SystemExit, match='--replace'):
+        append(tmp_path, month_table(month))
+    assert read_month(target, month).equals(before)
+
+    table = month_table(month, value=pc.multiply(month_table(month)['value'], 2))
+    append(tmp_path, table, replace=True)
+    assert read_month(target, month)['value'].equals(table['value'])
+    assert sorted(os.listdir(os.path.join(target, f'bas_yrmn={month}'))) == [partition_sources.part_file]
+
+
+def test_large_string_append(tmp_path, target):
+    table = month_table('209901')
+    table = table.cast(pa.schema([pa.field(field.name, pa.large_string()) if field.type == pa.string() else field
+                                  for field in table.schema]))
+    assert partition_sources.validate_month(table, target)[3] == []
+    append(tmp_path, table)
+    written = read_month(target, '209901')
+    assert written.schema.equals(read_month(target, sorted(os.listdir(target))[0].split('=', 1)[1]).schema)
+    assert written['depart'].to_pylist() == table['depart'].to_pylist()
+    assert not glob.glob(os.path.join(str(tmp_path), '*.tmp'))
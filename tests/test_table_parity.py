@@ -0,0 +1,121 @@
+"""배포된 원본 parquet 기준 취급지표 / 상품별 취급액 표 고정값 비교
+
+expected_tables.json 은 엔진 분리 전 대시보드가 그리던 표(문자열)와 같은 값이다.
+집계/표 계산을 바꾼 뒤에도 모든 월의 표가 그대로인지 확인한다.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import engine
+import store
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+with open(os.path.join(os.path.dirname(__file__), 'expected_tables.json'), encoding='utf-8') as file:
+    expected_tables = json.load(file)
+
+
+def link_sources(directory):
+    """directory 에 배포된 원본 parquet 을 링크"""
+    for path, *_ in engine.source_files.values():
+        os.symlink(os.path.join(repo_root, path), directory / path)
+
+
+@pytest.fixture(scope='module', params=['store', 'memory'])
+def bundle(request, tmp_path_factory):
+    """원본만 링크한 임시 디렉터리에서 만든 bundle - 공유 저장소에서 연 것(store)과 원본에서 바로 묶은 것(memory)"""
+    directory = tmp_path_factory.mktemp('sources')
+    link_sources(directory)
+    cwd = os.getcwd()
+    os.chdir(directory)
+    engine.part_cache.clear()
+    try:
+        if request.param == 'store':
+            yield store.load_bundle()
+        else:
+            data_version = engine.current_data_version()
+            yield engine.assemble_bundle({name: engine.load_source(name) for name in engine.source_files}, data_version)
+    finally:
+        os.chdir(cwd)
+
+
+def test_months(bundle):
+    months = bundle[0]
+    assert sorted(months) == sorted(expected_tables)
+
+
+@pytest.mark.parametrize('month', sorted(expected_tables))
+def test_kpi_table(bundle, month):
+    months, kpi_cube, *_ = bundle
+    frame = engine.compute_kpi_table(kpi_cube, month).to_frame()
+    assert [list(column) for column in frame.columns] == expected_tables[month]['kpi']['columns']
+    assert frame.values.tolist() == expected_tables[month]['kpi']['rows']
+
+
+@pytest.mark.parametrize('month', sorted(expected_tables))
+def test_product_table(bundle, month):
+    months, kpi_cube, loan_fact_by_month, *_ = bundle
+    frame = engine.compute_product_table(kpi_cube, loan_fact_by_month, month).to_frame()
+    assert list(frame.columns) == expected_tables[month]['product']['columns']
+    assert frame.values.tolist() == expected_tables[month]['product']['rows']
+
+
+def test_empty_scenario_is_identity(bundle):
+    months, kpi_cube, loan_fact_by_month, *_ = bundle
+    product_table = engine.compute_product_table(kpi_cube, loan_fact_by_month, months[0])
+    assert product_table.with_scenario(()) is product_table
+    assert engine.compute_kpi_table(kpi_cube, months[0], ()).to_frame().equals(engine.compute_kpi_table(kpi_cube, months[0]).to_frame())
+
+
+@pytest.mark.parametrize('month', sorted(expected_tables))
+def test_scenario_totals(bundle, month):
+    """(상품, 부서)마다 다른 배율의 시나리오에서 소계 = 하위 leaf 합, 달성률 = 실적 / 바뀐 OP,
+    취급지표의 구분1 취급액 OP = 상품별 취급액 표의 구분1 소계 OP"""
+    months, kpi_cube, loan_fact_by_month, *_ = bundle
+    scenario = tuple((key, 0.5 + 0.1 * position) for position, key in enumerate(engine.scenario_keys(kpi_cube)))
+    base = engine.compute_product_table(kpi_cube, loan_fact_by_month, month).values_frame()
+    table = engine.compute_product_table(kpi_cube, loan_fact_by_month, month).with_scenario(scenario).values_frame()
+    assert not np.allclose(table['누적_OP'], base['누적_OP'])
+    assert table.drop(columns=['당월_OP', '누적_OP', '당월_달성률', '누적_달성률']).equals(
+        base.drop(columns=['당월_OP', '누적_OP', '당월_달성률', '누적_달성률']))
+
+    leaf = table[table['소계깊이'] == len(engine.subtotal_levels)]
+    for _, row in table[table['소계깊이'] < len(engine.subtotal_levels)].iterrows():
+        covered = np.logical_and.reduce([leaf[column] == row[column] for column in engine.groups if pd.notna(row[column])])
+        assert row[['당월_OP', '누적_OP']].to_numpy(dtype=float) == pytest.approx(
+            leaf.loc[covered, ['당월_OP', '누적_OP']].sum().to_numpy(dtype=float))
+    for period in ['당월', '누적']:
+        op, actual, rate = table[[f'{period}_OP', f'{period}_실적', f'{period}_달성률']].to_numpy(dtype=float).T
+        assert rate == pytest.approx(np.where(op > 0, actual / op * 100, 0))
+
+    kpi_table = engine.compute_kpi_table(kpi_cube, month, scenario)
+    for division in ['신차', '중고']:
+        total = table[(table['소계깊이'] == 0) & (table['구분1'] == division)].iloc[0]
+        kpi_row = kpi_table.total(f'{division}_취급액')
+        assert (kpi_row.op, kpi_row.ytd_op) == pytest.approx((total['당월_OP'], total['누적_OP']))
+
+
+def test_year_total_rows_are_excluded(tmp_path, monkeypatch):
+    """실적 원본에 연 합계 행(기준년월 '2025')이 있어도 월 목록/표는 그대로이고 데이터 점검에만 보고된다"""
+    link_sources(tmp_path)
+    path = engine.source_files['df_handover'][0]
+    df_handover = pd.read_parquet(os.path.join(repo_root, path))
+    year_total = (df_handover[df_handover['기준년월'].str.startswith('2025')]
+                  .groupby('상품구분', as_index=False)[['인수율분모', '인수율분자값']].sum().assign(기준년월='2025'))
+    os.remove(tmp_path / path)
+    pd.concat([df_handover, year_total], ignore_index=True).to_parquet(tmp_path / path, index=False)
+    monkeypatch.chdir(tmp_path)
+    engine.part_cache.clear()
+
+    months, kpi_cube, loan_fact_by_month, quality_report, data_version, month_versions = store.load_bundle()
+    assert sorted(months) == sorted(expected_tables) == sorted(month_versions)
+    for month in months:
+        assert engine.compute_kpi_table(kpi_cube, month).to_frame().values.tolist() == expected_tables[month]['kpi']['rows']
+        assert (engine.compute_product_table(kpi_cube, loan_fact_by_month, month).to_frame().values.tolist()
+                == expected_tables[month]['product']['rows'])
+    reported = quality_report[(quality_report['검사'] == '월 형식') & (quality_report['원본'] == 'df_handover')]
+    assert reported['기준년월'].tolist() == ['2025']